@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+
+from .settings import PLUGIN_SETTINGS
+
+
+class LayoutAudit:
+    """Sizes of card texts that don't fit on canvas.
+
+    Text is wrapped and measured exactly like when card is generated, but
+    nothing is drawn or saved.
+    """
+
+    def __init__(self):
+        self.checked = 0
+        self.overflowing = []
+        self.total_seconds = 0
+
+    def check(self, cards_generator, content_object):
+        """Measure text of card for content object, remembering it if it overflows."""
+        text, font_size, (width, height) = cards_generator.measure_text(content_object)
+        self.checked += 1
+        if (
+            width > PLUGIN_SETTINGS["CANVAS_WIDTH"]
+            or height > PLUGIN_SETTINGS["CANVAS_HEIGHT"]
+        ):
+            self.overflowing.append(
+                {
+                    "source_path": str(content_object.source_path),
+                    "text": text,
+                    "font_size": font_size,
+                    "width": width,
+                    "height": height,
+                }
+            )
+
+    def as_dict(self):  # noqa: D102
+        return {
+            "canvas": {
+                "width": PLUGIN_SETTINGS["CANVAS_WIDTH"],
+                "height": PLUGIN_SETTINGS["CANVAS_HEIGHT"],
+            },
+            "checked": self.checked,
+            "overflowing": self.overflowing,
+            "total_seconds": self.total_seconds,
+        }
+
+    def format_report(self, label):
+        """Return human-readable list of overflowing texts."""
+        canvas_size = (
+            f"{PLUGIN_SETTINGS['CANVAS_WIDTH']}x{PLUGIN_SETTINGS['CANVAS_HEIGHT']}"
+        )
+        summary = (
+            f"{label}: {len(self.overflowing)} of {self.checked} cards have text "
+            f"that doesn't fit on {canvas_size} canvas"
+        )
+        lines = [summary]
+        for entry in self.overflowing:
+            lines.append(
+                f"  {entry['source_path']}: {entry['width']}x{entry['height']}, "
+                f"font size {entry['font_size']}"
+            )
+            lines.extend(f"    {line}" for line in entry["text"])
+        return "\n".join(lines)
+
+
+def save_audit(path, audits_by_label):
+    """Write layout audits of all generators to JSON file."""
+    data = {label: audit.as_dict() for label, audit in audits_by_label.items()}
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2)
@@ -0,0 +1,154 @@
+import logging
+from pathlib import Path
+import time
+
+from .cards_generator import get_profile_paths, link_file
+from .storage import file_lock, load_json_state, save_json_state
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+CACHE_INDEX_NAME = "index.json"
+CACHE_LOCK_NAME = "index.lock"
+
+
+class CardsCache:
+    """Rendered cards stored by fingerprint, outside of content directory.
+
+    Cache may be kept between builds that start from fresh checkout, e.g.
+    in CI, and shared by multiple sites. Cards are hardlinked (or copied)
+    from cache to ``SOCIAL_CARDS_PATH``. Least recently used cards are
+    removed when cache grows over size limit.
+
+    Builds that share cache may run at the same time. Index is saved under
+    file lock, merged with changes that other builds saved in the meantime.
+    """
+
+    def __init__(self, path, size_limit=0):
+        self._path = Path(path)
+        self._index_path = self._path / CACHE_INDEX_NAME
+        self._size_limit = size_limit
+        self._entries = self._read_index()
+        self._touched = set()
+        self._removed = set()
+
+    def _read_index(self):
+        data = load_json_state(self._index_path, CACHE_VERSION, "cache index")
+        if data is None:
+            return {}
+        return data.get("cards", {})
+
+    def _card_files(self, fingerprint, target_path):
+        """Return pairs of paths of card files in cache and in output."""
+        cache_path = self._path / fingerprint[:2] / f"{fingerprint}{target_path.suffix}"
+        cache_profile_paths = get_profile_paths(cache_path)
+        return [(cache_path, target_path)] + [
+            (cache_profile_paths[key_name], profile_path)
+            for key_name, profile_path in get_profile_paths(target_path).items()
+        ]
+
+    def fetch(self, fingerprint, target_path):
+        """Put card with given fingerprint at target path, if it's in cache.
+
+        Returns ``True`` if card was found.
+        """
+        if fingerprint not in self._entries:
+            return False
+
+        card_files = self._card_files(fingerprint, target_path)
+        try:
+            for cache_path, path in card_files:
+                link_file(cache_path, path)
+        except OSError as e:
+            logger.debug(f"Card {fingerprint} is missing from cache: {e}")
+            self._remove(fingerprint)
+            return False
+
+        self._entries[fingerprint]["used"] = time.time()
+        self._touched.add(fingerprint)
+        return True
+
+    def store(self, fingerprint, target_path):
+        """Add card saved at target path to cache."""
+        if fingerprint in self._entries:
+            self._entries[fingerprint]["used"] = time.time()
+            self._touched.add(fingerprint)
+            return
+
+        card_files = self._card_files(fingerprint, target_path)
+        try:
+            for cache_path, path in card_files:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                link_file(path, cache_path)
+        except OSError as e:
+            logger.warning(
+                f"pelican.plugins.social_cards: Can't store {target_path} in cache: {e}"
+            )
+            return
+
+        self._entries[fingerprint] = {
+            "files": [
+                cache_path.relative_to(self._path).as_posix()
+                for cache_path, _ in card_files
+            ],
+            "size": sum(cache_path.stat().st_size for cache_path, _ in card_files),
+            "used": time.time(),
+        }
+        self._touched.add(fingerprint)
+        self._removed.discard(fingerprint)
+
+    def _remove(self, fingerprint):
+        entry = self._entries.pop(fingerprint)
+        for file_name in entry["files"]:
+            (self._path / file_name).unlink(missing_ok=True)
+        self._touched.discard(fingerprint)
+        self._removed.add(fingerprint)
+
+    def evict(self):
+        """Remove least recently used cards, until cache fits in size limit.
+
+        Returns number of removed cards.
+        """
+        if self._size_limit <= 0:
+            return 0
+
+        total_size = sum(entry["size"] for entry in self._entries.values())
+        by_last_use = sorted(self._entries, key=lambda key: self._entries[key]["used"])
+        removed = 0
+        for fingerprint in by_last_use:
+            if total_size <= self._size_limit:
+                break
+            total_size -= self._entries[fingerprint]["size"]
+            self._remove(fingerprint)
+            removed += 1
+        return removed
+
+    def _merge_saved_index(self):
+        """Apply changes made by this build to index as it is saved now."""
+        entries = self._read_index()
+        for fingerprint in self._removed:
+            entries.pop(fingerprint, None)
+        for fingerprint in self._touched:
+            entry = self._entries[fingerprint]
+            saved_entry = entries.get(fingerprint)
+            if saved_entry is not None:
+                saved_entry["used"] = max(saved_entry["used"], entry["used"])
+            # card may have been evicted by other build
+            elif all((self._path / name).exists() for name in entry["files"]):
+                entries[fingerprint] = entry
+        self._entries = entries
+
+    def save(self):
+        """Evict cards over size limit, and write index to disk if needed."""
+        if not self._touched and not self._removed:
+            return
+
+        with file_lock(self._path / CACHE_LOCK_NAME):
+            self._merge_saved_index()
+            self._touched.clear()
+            self._removed.clear()
+            evicted = self.evict()
+            if evicted:
+                logger.debug(f"Removed {evicted} least recently used cards from cache")
+            data = {"version": CACHE_VERSION, "cards": self._entries}
+            save_json_state(self._index_path, data, indent=0)
@@ -1,14 +1,281 @@
+from collections import OrderedDict, namedtuple
+import contextlib
+import filecmp
+import hashlib
 import html
+import io
+import json
 import logging
+import os
+import shutil
+import time
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 
-from .settings import PLUGIN_SETTINGS
+from .manifest import file_digest
+from .metrics import line_metrics
+from .settings import (
+    PALETTE_FORMATS,
+    PLUGIN_SETTINGS,
+    VISUAL_SETTINGS,
+    registered_extensions,
+)
+from .stats import BuildStats
+from .storage import replacing, write_atomically
+from .svg import (
+    SvgCard,
+    color_attributes,
+    data_uri,
+    font_attributes,
+    is_svg,
+    outline_attributes,
+    shadow_filter,
+)
 
 logger = logging.getLogger(__name__)
 
 TYPOGRIFY_SPAN_CLASSES = ("amp", "caps", "dquo", "quo")
 
+# Image modes that can be saved in given format, for formats that don't
+# support all of them
+OUTPUT_MODES = {"JPEG": ("1", "L", "RGB", "CMYK")}
+
+# Blur radius (as fraction of outline size) and value of blurred text mask
+# at the edge of outline, chosen so outline closely matches stroked text
+OUTLINE_BLUR_DIVISOR = 2.4
+OUTLINE_EDGE_VALUE = 2
+OUTLINE_LUT = [min(255, value * 255 // OUTLINE_EDGE_VALUE) for value in range(256)]
+
+# Pillow keeps pixels of multi-band images in 32 bits, whatever the mode
+IMAGE_BYTES_PER_PIXEL = 4
+
+# Read-only templates in memory shared with main process, by template path
+shared_templates = {}
+
+# Settings that affect how font and template files are loaded
+FONT_LOADING_SETTINGS = ("FONT_FILENAME", "FONT_SIZE", "VARIANTS")
+TEMPLATE_LOADING_SETTINGS = (
+    "TEMPLATE",
+    "VARIANTS",
+    "DRAFT_SCALE",
+    "FONT_OUTLINE_METHOD",
+    "SHADOW_OFFSET",
+)
+
+# Fingerprints and modification times of cards saved by this process, by
+# card path. With --autoreload, Pelican builds site again in the same
+# process, and cards that didn't change since are not drawn again.
+rendered_cards = {}
+
+Card = namedtuple(
+    "Card",
+    ["target_path", "text", "fingerprint", "font_size", "variant"],
+    defaults=(None, None),
+)
+
+
+def output_extensions():
+    """Return file extensions of card and of its sizes in output profiles."""
+    return {PLUGIN_SETTINGS["FORMAT_EXTENSION"].lower()} | {
+        profile["FORMAT_EXTENSION"].lower()
+        for profile in PLUGIN_SETTINGS["PROFILES"].values()
+    }
+
+
+def needs_raster_output():
+    """Check if card is saved in any bitmap format, and has to be drawn."""
+    return not all(map(is_svg, output_extensions()))
+
+
+def needs_svg_output():
+    return any(map(is_svg, output_extensions()))
+
+
+def replace_if_changed(target_path, data):
+    """Atomically replace file with data, unless it already has that content.
+
+    Returns ``True`` if file was written.
+    """
+    with contextlib.suppress(OSError):
+        if target_path.stat().st_size == len(data) and target_path.read_bytes() == data:
+            return False
+
+    write_atomically(target_path, data)
+    return True
+
+
+def file_mtime(path):
+    """Return modification time of file, or ``None`` if it can't be read."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except (OSError, TypeError):
+        return None
+
+
+def loading_state(settings, paths):
+    """Return value that changes when any of settings or files changes."""
+    return json.dumps(
+        {
+            "settings": {key: PLUGIN_SETTINGS.get(key) for key in settings},
+            "mtimes": [file_mtime(path) for path in paths],
+        },
+        sort_keys=True,
+        default=str,
+    )
+
+
+def link_file(source_path, target_path):
+    """Hardlink file to target path, or copy it if that's not possible.
+
+    Target is replaced atomically, and left alone if it's identical.
+    """
+    with contextlib.suppress(OSError):
+        if filecmp.cmp(source_path, target_path, shallow=False):
+            return
+
+    with replacing(target_path) as tmp_path:
+        try:
+            os.link(source_path, tmp_path)
+        except OSError:
+            shutil.copyfile(source_path, tmp_path)
+
+
+def get_profile_paths(card_path):
+    """Return paths of card in sizes of output profiles, by profile key name."""
+    return {
+        key_name: card_path.with_name(
+            f"{card_path.stem}-{key_name}.{profile['FORMAT_EXTENSION']}"
+        )
+        for key_name, profile in PLUGIN_SETTINGS["PROFILES"].items()
+    }
+
+
+def resize_to_fill(img, size):
+    """Scale image to given size, cropping it if aspect ratio is different."""
+    if img.size == size:
+        return img
+
+    width, height = img.size
+    target_width, target_height = size
+    scale = max(target_width / width, target_height / height)
+    crop_width, crop_height = target_width / scale, target_height / scale
+    left, top = (width - crop_width) / 2, (height - crop_height) / 2
+    return img.resize(
+        size,
+        Image.Resampling.LANCZOS,
+        box=(left, top, left + crop_width, top + crop_height),
+        reducing_gap=3.0,
+    )
+
+
+def card_memory_size(template):
+    """Estimate memory needed to hold card drawn on template, with its profiles."""
+    sizes = [template.size]
+    sizes.extend(profile["SIZE"] for profile in PLUGIN_SETTINGS["PROFILES"].values())
+    return sum(width * height * IMAGE_BYTES_PER_PIXEL for width, height in sizes)
+
+
+def new_work_image(template):
+    """Return writable copy of template to draw card on.
+
+    Shared RGB templates are stored as RGBX, which most formats can't save.
+    """
+    if template.mode == "RGBX":
+        return template.convert("RGB")
+    return template.copy()
+
+
+def uses_mask_effects():
+    """Check if text should be drawn through mask, with effects derived from it."""
+    return (
+        PLUGIN_SETTINGS["FONT_OUTLINE_METHOD"] == "mask"
+        or PLUGIN_SETTINGS["SHADOW_OFFSET"] is not None
+    )
+
+
+def grow_mask(mask, size):
+    """Grow shapes on mask by about ``size`` pixels in every direction.
+
+    Mask is blurred and thresholded, so unlike max filter or stroked text,
+    the cost doesn't depend on size.
+    """
+    from PIL import ImageFilter  # noqa: PLC0415
+
+    blurred = mask.filter(ImageFilter.GaussianBlur(size / OUTLINE_BLUR_DIVISOR))
+    return blurred.point(OUTLINE_LUT)
+
+
+def load_template(path):
+    """Open and decode template image.
+
+    Template is scaled down in draft mode. Template decoded by main process
+    and shared with worker process is used as is.
+    """
+    shared_template = shared_templates.get(str(path))
+    if shared_template is not None:
+        return shared_template
+
+    template = Image.open(path)
+    template.load()
+
+    scale = PLUGIN_SETTINGS.get("DRAFT_SCALE")
+    if scale:
+        size = (
+            max(round(template.width * scale), 1),
+            max(round(template.height * scale), 1),
+        )
+        template = template.resize(size, Image.Resampling.BILINEAR)
+
+    if uses_mask_effects() and template.mode not in ("RGB", "RGBA"):
+        template = template.convert("RGBA" if template.has_transparency_data else "RGB")
+    return template
+
+
+class TemplateCache:
+    """Bounded LRU cache of decoded template images."""
+
+    def __init__(self):
+        self._templates = OrderedDict()
+
+    def get(self, path):
+        """Return decoded template, loading it only if necessary."""
+        key = str(path)
+        if key in self._templates:
+            self._templates.move_to_end(key)
+            return self._templates[key]
+
+        template = load_template(path)
+        self._templates[key] = template
+        while len(self._templates) > max(PLUGIN_SETTINGS["TEMPLATE_CACHE_SIZE"], 1):
+            self._templates.popitem(last=False)
+        return template
+
+    def clear(self):  # noqa: D102
+        self._templates.clear()
+
+
+template_cache = TemplateCache()
+
+
+def wrap_to_width(text, font, width):
+    """Break text into lines that are at most ``width`` pixels wide.
+
+    Lines are broken on whitespace only, so single word that is wider
+    than ``width`` is put on a line of its own.
+    """
+    lines = []
+    current_line = ""
+    for word in text.split():
+        candidate = f"{current_line} {word}" if current_line else word
+        if current_line and font.getlength(candidate) > width:
+            lines.append(current_line)
+            current_line = word
+        else:
+            current_line = candidate
+    if current_line:
+        lines.append(current_line)
+    return lines
+
 
 class TextBox:
     """Helper that breaks long line into a list of shorter lines."""
@@ -30,8 +297,10 @@ class TextBox:
         max_height = 0
 
         for line in self._text:
-            _, _, font_width, font_height = self._font.getbbox(line)
+            left, top, font_width, font_height = line_metrics.getbbox(self._font, line)
             self._line_dimensions[line] = {
+                "left": left,
+                "top": top,
                 "width": font_width,
                 "height": font_height,
             }
@@ -45,25 +314,91 @@ class TextBox:
     def width_of_line(self, line):  # noqa: D102
         return self._line_dimensions.get(line, {}).get("width", 0)
 
+    def bbox_of_line(self, line, xy, stroke_width=0):
+        """Return box of image area covered by line drawn at given point."""
+        x, y = xy
+        dimensions = self._line_dimensions.get(line, {})
+        return (
+            x + dimensions.get("left", 0) - stroke_width,
+            y + dimensions.get("top", 0) - stroke_width,
+            x + dimensions.get("width", 0) + stroke_width,
+            y + dimensions.get("height", 0) + stroke_width,
+        )
+
 
 class CardsGenerator:
     """Main class that generates social media images."""
 
     _font = None
+    _fonts = None
+    _font_state = None
     _template = None
+    _template_state = None
 
-    def __init__(self):
-        if not self._font:
-            type(self)._font = ImageFont.truetype(
+    def __init__(self, manifest=None, cache=None):
+        self._manifest = manifest
+        self._cache = cache
+        self._inputs_digests = {}
+        self._checked_templates = set()
+        self._work_images = {}
+        self._svg_templates = {}
+        self._svg_cards = {}
+        self.stats = BuildStats()
+        self._unload_stale_files()
+
+    @classmethod
+    def unload_files(cls, font=True, template=True):
+        """Forget loaded fonts and templates, so they are read again."""
+        if font:
+            cls._font = None
+            cls._fonts = None
+            cls._font_state = None
+            line_metrics.forget_fonts()
+        if template:
+            cls._template = None
+            template_cache.clear()
+            cls._template_state = None
+
+    @classmethod
+    def _unload_stale_files(cls):
+        """Forget fonts and templates kept from previous build if they changed.
+
+        Files are only compared by modification time, together with
+        settings that affect how they are loaded.
+        """
+        variants = PLUGIN_SETTINGS.get("VARIANTS", {}).values()
+        font_state = loading_state(
+            FONT_LOADING_SETTINGS,
+            [PLUGIN_SETTINGS.get("FONT_FILENAME")]
+            + [variant.get("FONT_FILENAME") for variant in variants],
+        )
+        template_state = loading_state(
+            TEMPLATE_LOADING_SETTINGS,
+            [PLUGIN_SETTINGS.get("TEMPLATE")]
+            + [variant.get("TEMPLATE") for variant in variants],
+        )
+        font_changed = cls._font_state not in (None, font_state)
+        template_changed = cls._template_state not in (None, template_state)
+        if font_changed or template_changed:
+            logger.debug("Font or template has changed, loading it again")
+            cls.unload_files(font=font_changed, template=template_changed)
+        cls._font_state = font_state
+        cls._template_state = template_state
+
+    @classmethod
+    def _load_font(cls):
+        """Return default font, loading it on first use."""
+        if not cls._font:
+            from PIL import ImageFont  # noqa: PLC0415
+
+            cls._font = ImageFont.truetype(
                 PLUGIN_SETTINGS["FONT_FILENAME"], size=PLUGIN_SETTINGS["FONT_SIZE"]
             )
+        return cls._font
 
-        if not self._template:
-            type(self)._template = Image.open(PLUGIN_SETTINGS["TEMPLATE"])
-            self._check_canvas_position()
-
-    def _check_canvas_position(self):
-        template_w, template_h = self._template.size
+    def _check_canvas_position(self, template=None):
+        template = template or self._template
+        template_w, template_h = template.size
         canvas_w = PLUGIN_SETTINGS["CANVAS_WIDTH"] + PLUGIN_SETTINGS["CANVAS_LEFT"]
         canvas_h = PLUGIN_SETTINGS["CANVAS_HEIGHT"] + PLUGIN_SETTINGS["CANVAS_TOP"]
 
@@ -76,13 +411,135 @@ class CardsGenerator:
                 ).format(template_w, template_h, canvas_w, canvas_h)
             )
 
-    def _get_article_title(self, article):
+    def _get_inputs_digest(self, variant=None):
+        if variant not in self._inputs_digests:
+            variant_settings = self._get_variant_settings(variant)
+            font_path = variant_settings["FONT"] or PLUGIN_SETTINGS["FONT_FILENAME"]
+            if not os.path.isfile(font_path):
+                # font given by name is found by Pillow in system directories
+                font_path = self._get_font(variant=variant).path
+            inputs = {
+                "template": file_digest(variant_settings["TEMPLATE"]),
+                "font": file_digest(font_path),
+                "settings": {key: PLUGIN_SETTINGS[key] for key in VISUAL_SETTINGS},
+            }
+            self._inputs_digests[variant] = json.dumps(
+                inputs, sort_keys=True, default=str
+            )
+        return self._inputs_digests[variant]
+
+    def _get_fingerprint(self, text, font_size=None, variant=None):
+        fingerprint = hashlib.sha256(self._get_inputs_digest(variant).encode())
+        fingerprint.update(json.dumps([text, font_size]).encode())
+        return fingerprint.hexdigest()
+
+    def _get_variant_settings(self, variant=None):
+        variant_settings = PLUGIN_SETTINGS.get("VARIANTS", {}).get(variant, {})
+        return {
+            "TEMPLATE": variant_settings.get(
+                "TEMPLATE", PLUGIN_SETTINGS.get("TEMPLATE")
+            ),
+            "FONT": variant_settings.get("FONT_FILENAME"),
+        }
+
+    def _get_variant(self, content_object):
+        """Return name of template variant to use for content object, or None.
+
+        Variant is chosen by metadata, then by category, then by tags.
+        """
+        variants = PLUGIN_SETTINGS["VARIANTS"]
+        if not variants:
+            return None
+
+        key_name = PLUGIN_SETTINGS["KEY_NAME"]
+        variant = getattr(content_object, f"{key_name}_template", None)
+        category = getattr(content_object, "category", None)
+        if not variant and category:
+            variant = PLUGIN_SETTINGS["CATEGORY_VARIANTS"].get(str(category))
+        if not variant:
+            tag_variants = PLUGIN_SETTINGS["TAG_VARIANTS"]
+            tags = getattr(content_object, "tags", None) or []
+            variant = next(
+                (tag_variants[str(tag)] for tag in tags if str(tag) in tag_variants),
+                None,
+            )
+
+        if variant and variant not in variants:
+            logger.warning(
+                f"pelican.plugins.social_cards: Unknown template variant {variant} "
+                f"requested by {content_object.source_path}, using default template"
+            )
+            return None
+        return variant or None
+
+    def _get_template(self, variant=None):
+        """Return template to draw card on, loading it on first use."""
+        if variant is None:
+            if not self._template:
+                type(self)._template = load_template(PLUGIN_SETTINGS["TEMPLATE"])
+                self._check_canvas_position()
+            return self._template
+
+        template_path = self._get_variant_settings(variant)["TEMPLATE"]
+        template = template_cache.get(template_path)
+        if template_path not in self._checked_templates:
+            self._checked_templates.add(template_path)
+            self._check_canvas_position(template)
+        return template
+
+    def get_templates(self, cards):
+        """Return templates that cards are drawn on, by template path."""
+        return {
+            str(self._get_variant_settings(variant)["TEMPLATE"]): self._get_template(
+                variant
+            )
+            for variant in {card.variant for card in cards}
+        }
+
+    def _get_font(self, size=None, variant=None):
+        """Return font of given size, loading each font only once."""
+        if self._fonts is None:
+            type(self)._fonts = {}
+        font_filename = None
+        if variant is not None:
+            font_filename = self._get_variant_settings(variant)["FONT"]
+        if font_filename is None:
+            font = self._load_font()
+            if size is None or size == font.size:
+                return font
+            if size not in self._fonts:
+                self._fonts[size] = font.font_variant(size=size)
+            return self._fonts[size]
+
+        size = size or PLUGIN_SETTINGS["FONT_SIZE"]
+        if (font_filename, size) not in self._fonts:
+            from PIL import ImageFont  # noqa: PLC0415
+
+            self._fonts[(font_filename, size)] = ImageFont.truetype(
+                font_filename, size=size
+            )
+        return self._fonts[(font_filename, size)]
+
+    def _get_metadata_title(self, article):
         metadata_title = getattr(article, f"{PLUGIN_SETTINGS['KEY_NAME']}_text", None)
         if metadata_title:
             return metadata_title.split("\\n")
+        return None
+
+    def _get_article_title(self, article):
+        metadata_title = self._get_metadata_title(article)
+        if metadata_title:
+            return metadata_title
 
         wrapping_function = PLUGIN_SETTINGS["WRAPPING_FUNCTION"]
 
+        title = wrapping_function(
+            self._get_plain_title(article), width=PLUGIN_SETTINGS["CHARS_PER_LINE"]
+        )
+        return title
+
+    def _get_plain_title(self, article):
+        """Return article title, without markup and with series name."""
         title = article.metadata.get("title", "")
         if article.settings.get("TYPOGRIFY"):
             for class_name in TYPOGRIFY_SPAN_CLASSES:
@@ -100,10 +557,68 @@ class CardsGenerator:
             series = PLUGIN_SETTINGS["SERIES_FORMAT"].format(series)
             title = f"{series}{title}"
 
-        title = wrapping_function(
-            title.strip(), width=PLUGIN_SETTINGS["CHARS_PER_LINE"]
+        return title.strip()
+
+    def _fit_article_title(self, article, variant=None):
+        """Find the largest font size that allows text to fit on canvas.
+
+        Title is wrapped to canvas width for each tried font size. Returns
+        lines of text and font size.
+        """
+        canvas_width = PLUGIN_SETTINGS["CANVAS_WIDTH"]
+        canvas_height = PLUGIN_SETTINGS["CANVAS_HEIGHT"]
+        metadata_title = self._get_metadata_title(article)
+        title = None if metadata_title else self._get_plain_title(article)
+
+        def layout(font_size):
+            font = self._get_font(font_size, variant)
+            text = metadata_title or wrap_to_width(title, font, canvas_width)
+            text_box = TextBox(text, font)
+            fits = text_box.width <= canvas_width and text_box.height <= canvas_height
+            return text, fits
+
+        smallest_size = min(
+            PLUGIN_SETTINGS["MIN_FONT_SIZE"], PLUGIN_SETTINGS["FONT_SIZE"]
         )
-        return title
+        min_size = smallest_size
+        max_size = PLUGIN_SETTINGS["FONT_SIZE"]
+
+        text, fits = layout(max_size)
+        if fits:
+            return text, max_size
+
+        best = None
+        while min_size < max_size:
+            font_size = (min_size + max_size) // 2
+            text, fits = layout(font_size)
+            if fits:
+                best = (text, font_size)
+                min_size = font_size + 1
+            else:
+                max_size = font_size
+
+        if best is None:
+            best = (layout(smallest_size)[0], smallest_size)
+        return best
+
+    def _get_article_text(self, article, variant=None):
+        """Return lines of text to draw on card, and font size to use."""
+        if PLUGIN_SETTINGS["AUTO_FIT"]:
+            return self._fit_article_title(article, variant)
+        return self._get_article_title(article), None
+
+    def measure_text(self, content_object):
+        """Lay out text of card for content object, without drawing it.
+
+        Returns lines of text, font size, and size of text block.
+        """
+        variant = self._get_variant(content_object)
+        with self.stats.timer("wrapping"):
+            text, font_size = self._get_article_text(content_object, variant)
+        font_size = font_size or PLUGIN_SETTINGS["FONT_SIZE"]
+        with self.stats.timer("layout"):
+            text_box = TextBox(text, self._get_font(font_size, variant))
+        return text, font_size, (text_box.width, text_box.height)
 
     def _get_card_path(self, content_object):
         card_stem = content_object.save_as.replace("/", "-")
@@ -145,17 +660,16 @@ class CardsGenerator:
         x += canvas_left
         return x
 
-    def _generate_card_image(self, text):
-        img = self._template.copy()
-        draw = ImageDraw.Draw(img)
-        text_box = TextBox(text, self._font)
-        font_fill = PLUGIN_SETTINGS["FONT_FILL"]
+    def _layout_text(self, text, font, check_overflow=True):
+        """Return text box and position of each line of text on template."""
+        with self.stats.timer("layout"):
+            text_box = TextBox(text, font)
         canvas_width = PLUGIN_SETTINGS["CANVAS_WIDTH"]
         canvas_height = PLUGIN_SETTINGS["CANVAS_HEIGHT"]
-        outline_size = PLUGIN_SETTINGS["FONT_OUTLINE_SIZE"]
-        outline_fill = PLUGIN_SETTINGS["FONT_OUTLINE_FILL"]
 
-        if text_box.width > canvas_width or text_box.height > canvas_height:
+        overflows = text_box.width > canvas_width or text_box.height > canvas_height
+        if check_overflow and overflows:
+            self.stats.count("overflow")
             logger.warning(
                 (
                     "pelican.plugins.social_cards: Text requires more space than "
@@ -172,36 +686,442 @@ class CardsGenerator:
             )
 
         current_y = self._calc_current_y(text_box)
-
+        positions = []
         for line in text:
-            current_x = self._calc_current_x(text_box, line)
-            draw.text(
-                (current_x, current_y),
-                line,
-                font=self._font,
-                fill=font_fill,
-                stroke_width=outline_size,
-                stroke_fill=outline_fill,
-            )
+            positions.append((line, (self._calc_current_x(text_box, line), current_y)))
             current_y += text_box.line_height
+
+        return text_box, positions
+
+    def _draw_text(self, img, text, font):
+        """Draw text on image.
+
+        Returns box of image area that was drawn on, or ``None``.
+        """
+        from PIL import ImageDraw  # noqa: PLC0415
+
+        draw = ImageDraw.Draw(img)
+        text_box, positions = self._layout_text(text, font)
+        font_fill = PLUGIN_SETTINGS["FONT_FILL"]
+        outline_size = PLUGIN_SETTINGS["FONT_OUTLINE_SIZE"]
+        outline_fill = PLUGIN_SETTINGS["FONT_OUTLINE_FILL"]
+
+        with self.stats.timer("drawing"):
+            if uses_mask_effects():
+                return self._draw_text_with_effects(img, font, text_box, positions)
+
+            drawn_boxes = []
+            for line, xy in positions:
+                draw.text(
+                    xy,
+                    line,
+                    font=font,
+                    fill=font_fill,
+                    stroke_width=outline_size,
+                    stroke_fill=outline_fill,
+                )
+                drawn_boxes.append(text_box.bbox_of_line(line, xy, outline_size))
+
+        return self._clip_box(drawn_boxes, img.size)
+
+    def _draw_text_with_effects(self, img, font, text_box, positions):
+        """Draw text through mask, with outline and shadow derived from mask.
+
+        Text is rasterized once, into mask covering only the text block.
+        Outline is that mask grown by outline size, and shadow is outline
+        (or text) mask moved by offset and blurred. Returns box of image
+        area that was drawn on, or ``None``.
+        """
+        from PIL import ImageDraw  # noqa: PLC0415
+
+        outline_size = PLUGIN_SETTINGS["FONT_OUTLINE_SIZE"]
+        shadow_offset = PLUGIN_SETTINGS["SHADOW_OFFSET"]
+        shadow_x, shadow_y = shadow_offset or (0, 0)
+        shadow_margin = PLUGIN_SETTINGS["SHADOW_BLUR"] * 3 if shadow_offset else 0
+
+        if not positions:
+            return None
+
+        boxes = [
+            text_box.bbox_of_line(line, xy, outline_size) for line, xy in positions
+        ]
+        text_block = (
+            min(box[0] for box in boxes) + min(shadow_x, 0) - shadow_margin,
+            min(box[1] for box in boxes) + min(shadow_y, 0) - shadow_margin,
+            max(box[2] for box in boxes) + max(shadow_x, 0) + shadow_margin,
+            max(box[3] for box in boxes) + max(shadow_y, 0) + shadow_margin,
+        )
+        region = self._clip_box([text_block], img.size)
+        if region is None:
+            return None
+
+        region_left, region_top = region[:2]
+        region_size = (region[2] - region_left, region[3] - region_top)
+        text_mask = Image.new("L", region_size, 0)
+        draw = ImageDraw.Draw(text_mask)
+        for line, (x, y) in positions:
+            draw.text((x - region_left, y - region_top), line, font=font, fill=255)
+
+        body_mask = text_mask
+        if outline_size > 0:
+            body_mask = grow_mask(text_mask, outline_size)
+
+        if shadow_offset is not None:
+            self._draw_shadow(img, region, body_mask, shadow_offset)
+        if outline_size > 0:
+            img.paste(PLUGIN_SETTINGS["FONT_OUTLINE_FILL"], region, body_mask)
+        img.paste(PLUGIN_SETTINGS["FONT_FILL"], region, text_mask)
+        return region
+
+    @staticmethod
+    def _draw_shadow(img, region, mask, offset):
+        from PIL import ImageColor, ImageFilter  # noqa: PLC0415
+
+        *shadow_color, opacity = ImageColor.getcolor(
+            PLUGIN_SETTINGS["SHADOW_FILL"], "RGBA"
+        )
+        if img.mode == "RGBA":
+            shadow_color.append(255)
+
+        shadow_mask = Image.new("L", mask.size, 0)
+        shadow_mask.paste(mask, offset)
+        if PLUGIN_SETTINGS["SHADOW_BLUR"] > 0:
+            shadow_mask = shadow_mask.filter(
+                ImageFilter.GaussianBlur(PLUGIN_SETTINGS["SHADOW_BLUR"])
+            )
+        shadow_mask = shadow_mask.point(lambda value: value * opacity // 255)
+        img.paste(tuple(shadow_color), region, shadow_mask)
+
+    @staticmethod
+    def _clip_box(boxes, size):
+        """Return box covering all boxes, limited to image of given size."""
+        if not boxes:
+            return None
+
+        # one pixel of margin, in case antialiasing reaches beyond the box
+        left = max(min(box[0] for box in boxes) - 1, 0)
+        top = max(min(box[1] for box in boxes) - 1, 0)
+        right = min(max(box[2] for box in boxes) + 1, size[0])
+        bottom = min(max(box[3] for box in boxes) + 1, size[1])
+
+        if left >= right or top >= bottom:
+            return None
+        return (left, top, right, bottom)
+
+    def _generate_card_image(self, text, font_size=None, variant=None):
+        img = new_work_image(self._get_template(variant))
+        self._draw_text(img, text, self._get_font(font_size, variant))
         return img
 
-    def create_for_object(self, content_object):
-        """Create a card for Pelican article object."""
+    def _generate_card_image_in_place(self, text, slot=0, font_size=None, variant=None):
+        """Draw text on image that is reused between calls.
+
+        Only the area that previous text was drawn on is restored from
+        template, so full template is not copied for every card. Returned
+        image is only valid until next call with the same ``slot``.
+        """
+        template = self._get_template(variant)
+        work_image, dirty_box, work_variant = self._work_images.get(
+            slot, (None, None, None)
+        )
+        if work_image is None or work_variant != variant:
+            work_image = new_work_image(template)
+        elif dirty_box is not None:
+            work_image.paste(template.crop(dirty_box), dirty_box)
+
+        font = self._get_font(font_size, variant)
+        dirty_box = self._draw_text(work_image, text, font)
+        self._work_images[slot] = (work_image, dirty_box, variant)
+        return work_image
+
+    def release_images(self):
+        """Free memory of images that cards were drawn on."""
+        for work_image, _, _ in self._work_images.values():
+            work_image.close()
+        self._work_images.clear()
+        self._svg_cards.clear()
+
+    def prepare_card(self, content_object):
+        """Decide if card for Pelican article object should be generated.
+
+        Returns ``Card`` describing image to generate, or ``None`` if
+        existing image can be used.
+        """
         logger.debug(
             f"pelican-social-cards: generating image for {content_object.source_path}"
         )
 
+        if PLUGIN_SETTINGS["DEDUPLICATE"] == "share":
+            return self._prepare_shared_card(content_object)
+
         target_path = self._get_card_path(content_object)
+        self._set_card_source(content_object, target_path)
+
+        with self.stats.timer("exists_check"):
+            target_exists = self._card_exists(target_path)
+        can_skip = target_exists and not PLUGIN_SETTINGS["FORCE_SAVE"]
+        if can_skip and self._manifest is None:
+            logger.debug(f"Refusing to overwrite existing {target_path}")
+            self.stats.count("skipped_existing")
+            return None
+
+        variant = self._get_variant(content_object)
+        with self.stats.timer("wrapping"):
+            article_title, font_size = self._get_article_text(content_object, variant)
+
+        fingerprint = self._get_fingerprint(article_title, font_size, variant)
+        if target_exists and self._is_rendered(target_path, fingerprint):
+            logger.debug(f"{target_path} was already generated by this process")
+            self.stats.count("skipped_existing")
+            return None
+
+        is_current = self._manifest is not None and self._manifest.is_current(
+            target_path, fingerprint
+        )
+        if can_skip and is_current:
+            logger.debug(f"{target_path} is up to date")
+            self.stats.count("skipped_existing")
+            return None
+
+        return Card(target_path, article_title, fingerprint, font_size, variant)
+
+    def _prepare_shared_card(self, content_object):
+        """Prepare card with file name derived from its fingerprint.
+
+        All content objects with the same text and template use the same
+        file, so it's generated only once.
+        """
+        variant = self._get_variant(content_object)
+        with self.stats.timer("wrapping"):
+            article_title, font_size = self._get_article_text(content_object, variant)
+        fingerprint = self._get_fingerprint(article_title, font_size, variant)
+
+        card_name = f"{fingerprint[:32]}.{PLUGIN_SETTINGS['FORMAT_EXTENSION']}"
+        target_path = PLUGIN_SETTINGS["PATH"] / card_name
+        self._set_card_source(content_object, target_path)
 
+        with self.stats.timer("exists_check"):
+            target_exists = self._card_exists(target_path)
+        if target_exists and (
+            not PLUGIN_SETTINGS["FORCE_SAVE"]
+            or self._is_rendered(target_path, fingerprint)
+        ):
+            logger.debug(f"{target_path} already exists")
+            self.stats.count("skipped_existing")
+            return None
+
+        return Card(target_path, article_title, fingerprint, font_size, variant)
+
+    @staticmethod
+    def _is_rendered(target_path, fingerprint):
+        """Check if this process saved card, and it wasn't modified since."""
+        return rendered_cards.get(target_path) == (
+            fingerprint,
+            file_mtime(target_path),
+        )
+
+    @staticmethod
+    def _card_exists(target_path):
+        """Check if card exists in all sizes."""
+        return target_path.exists() and all(
+            path.exists() for path in get_profile_paths(target_path).values()
+        )
+
+    def _set_card_source(self, content_object, target_path):
         attr_name = f"{PLUGIN_SETTINGS['KEY_NAME']}_source"
         setattr(content_object, attr_name, target_path.as_posix())
 
-        if target_path.exists() and not PLUGIN_SETTINGS["FORCE_SAVE"]:
-            logger.debug(f"Refusing to overwrite existing {target_path}")
+    def render_card(self, card):
+        """Draw card image and save it to disk."""
+        img, draw_seconds = self.draw_card(card)
+        encode_seconds = self.save_card(img, card)
+        self.record_rendered(card, draw_seconds, encode_seconds)
+        return card.target_path
+
+    def draw_card(self, card, slot=0, raster=False):
+        """Draw card image, without saving it.
+
+        Returns image and time it took to draw it. Image is reused for the
+        next card drawn in the same ``slot``. If card is saved only as SVG,
+        image is ``None``, unless ``raster`` is true.
+        """
+        start = time.perf_counter()
+        img = None
+        if raster or needs_raster_output():
+            img = self._generate_card_image_in_place(
+                card.text, slot, card.font_size, card.variant
+            )
+        if needs_svg_output():
+            self._svg_cards[card.target_path] = self._get_svg_card(
+                card, check_overflow=img is None
+            )
+        return img, time.perf_counter() - start
+
+    def save_card(self, img, card):
+        """Save card image to disk, returning time it took.
+
+        This may be called from other thread than the one drawing cards.
+        """
+        start = time.perf_counter()
+        svg_card = self._svg_cards.pop(card.target_path, None)
+        outputs = [(card.target_path, PLUGIN_SETTINGS["FORMAT_EXTENSION"], None)]
+        for key_name, profile_path in get_profile_paths(card.target_path).items():
+            profile = PLUGIN_SETTINGS["PROFILES"][key_name]
+            outputs.append((profile_path, profile["FORMAT_EXTENSION"], profile["SIZE"]))
+
+        for path, extension, size in outputs:
+            if is_svg(extension):
+                self._save_data(svg_card.encode(size), path)
+            elif size is None:
+                self._save_image(img, path)
+            else:
+                profile_img = resize_to_fill(img, size)
+                self._save_image(profile_img, path, extension)
+                if profile_img is not img:
+                    profile_img.close()
+        return time.perf_counter() - start
+
+    def _get_svg_template(self, variant=None):
+        """Return path and size of template, and its data URI in embed mode.
+
+        Only header of template file is read, image is not decoded.
+        """
+        template_path = self._get_variant_settings(variant)["TEMPLATE"]
+        if template_path not in self._svg_templates:
+            with Image.open(template_path) as template:
+                size = template.size
+                mime_type = template.get_format_mimetype()
+            scale = PLUGIN_SETTINGS.get("DRAFT_SCALE")
+            if scale:
+                size = tuple(max(round(value * scale), 1) for value in size)
+            href = None
+            if PLUGIN_SETTINGS["SVG_TEMPLATE"] == "embed":
+                with open(template_path, "rb") as fh:
+                    href = data_uri(fh.read(), mime_type)
+            self._svg_templates[template_path] = (size, href)
+        return (template_path, *self._svg_templates[template_path])
+
+    def _get_svg_card(self, card, check_overflow=True):
+        """Lay out text of card, like for drawing it, as SVG document."""
+        from PIL import ImageColor  # noqa: PLC0415
+
+        font = self._get_font(card.font_size, card.variant)
+        _, positions = self._layout_text(card.text, font, check_overflow)
+        # Pillow places top of ascender at given point, SVG places baseline
+        ascent = font.getmetrics()[0]
+        lines = [(line, (x, y + ascent)) for line, (x, y) in positions]
+
+        template_path, template_size, href = self._get_svg_template(card.variant)
+        if href is None:
+            href = os.path.relpath(template_path, card.target_path.parent)
+            href = href.replace(os.sep, "/")
+
+        family, style = font.getname()
+        text_attributes = [
+            font_attributes(family, style, font.size),
+            color_attributes(
+                "fill", ImageColor.getcolor(PLUGIN_SETTINGS["FONT_FILL"], "RGBA")
+            ),
+        ]
+        if PLUGIN_SETTINGS["FONT_OUTLINE_SIZE"] > 0:
+            outline_fill = PLUGIN_SETTINGS["FONT_OUTLINE_FILL"]
+            text_attributes.append(
+                outline_attributes(
+                    PLUGIN_SETTINGS["FONT_OUTLINE_SIZE"],
+                    ImageColor.getcolor(outline_fill, "RGBA"),
+                )
+            )
+        shadow = None
+        if PLUGIN_SETTINGS["SHADOW_OFFSET"] is not None:
+            shadow = shadow_filter(
+                PLUGIN_SETTINGS["SHADOW_OFFSET"],
+                PLUGIN_SETTINGS["SHADOW_BLUR"],
+                ImageColor.getcolor(PLUGIN_SETTINGS["SHADOW_FILL"], "RGBA"),
+            )
+        return SvgCard(template_size, href, lines, " ".join(text_attributes), shadow)
+
+    def record_rendered(self, card, draw_seconds, encode_seconds):
+        """Add timings of drawn and saved card to stats."""
+        self.stats.timings["encoding"] += encode_seconds
+        self.stats.count("rendered")
+        self.stats.record_card(card.target_path, draw_seconds + encode_seconds)
+
+    def _encode_image(self, img, extension=None):
+        """Return image encoded in format of given extension.
+
+        Image is converted to RGB if the format can't store its mode.
+        """
+        extension = (extension or PLUGIN_SETTINGS["FORMAT_EXTENSION"]).lower()
+        image_format = registered_extensions().get(f".{extension}")
+        save_options = PLUGIN_SETTINGS["SAVE_OPTIONS"].get(extension, {})
+        quantize_colors = PLUGIN_SETTINGS["QUANTIZE_COLORS"]
+
+        supported_modes = OUTPUT_MODES.get(image_format)
+        if supported_modes and img.mode not in supported_modes:
+            with img.convert("RGB") as converted:
+                return self._encode_image(converted, extension)
+
+        buffer = io.BytesIO()
+        can_quantize = img.mode in ("RGB", "RGBA") and image_format in PALETTE_FORMATS
+        if quantize_colors and can_quantize:
+            with img.quantize(colors=quantize_colors) as quantized:
+                quantized.save(buffer, format=image_format, **save_options)
+        else:
+            img.save(buffer, format=image_format, **save_options)
+        return buffer.getvalue()
+
+    def _save_image(self, img, target_path, extension=None):
+        """Save image, leaving existing file alone if it's identical."""
+        self._save_data(self._encode_image(img, extension), target_path)
+
+    def _save_data(self, data, target_path):
+        if not replace_if_changed(target_path, data):
+            logger.debug(f"{target_path} has not changed")
+            self.stats.count("unchanged")
+
+    def link_card(self, card, source_card):
+        """Use already saved image of ``source_card`` as image of ``card``.
+
+        Files are hardlinked if possible, and copied otherwise.
+        """
+        link_file(source_card.target_path, card.target_path)
+        source_profile_paths = get_profile_paths(source_card.target_path)
+        for key_name, profile_path in get_profile_paths(card.target_path).items():
+            link_file(source_profile_paths[key_name], profile_path)
+        self.stats.count("deduplicated")
+
+    def restore_card(self, card):
+        """Put card from cache in place, if it's there.
+
+        Returns ``True`` if card doesn't have to be rendered.
+        """
+        if self._cache is None or card.fingerprint is None:
+            return False
+        if PLUGIN_SETTINGS["FORCE_SAVE"]:
+            return False
+        if not self._cache.fetch(card.fingerprint, card.target_path):
+            return False
+        self.stats.count("cached")
+        return True
+
+    def commit_card(self, card):
+        """Record that card was saved to disk."""
+        if card.fingerprint is None:
             return
+        rendered_cards[card.target_path] = (
+            card.fingerprint,
+            file_mtime(card.target_path),
+        )
+        if self._manifest is not None:
+            self._manifest.update(card.target_path, card.fingerprint)
+        if self._cache is not None:
+            self._cache.store(card.fingerprint, card.target_path)
 
-        article_title = self._get_article_title(content_object)
+    def create_for_object(self, content_object):
+        """Create a card for Pelican article object."""
+        card = self.prepare_card(content_object)
+        if card is None:
+            return
 
-        img = self._generate_card_image(article_title)
-        img.save(target_path)
+        self.render_card(card)
+        self.commit_card(card)
@@ -0,0 +1,453 @@
+import argparse
+import contextlib
+import csv
+import io
+import json
+import logging
+from pathlib import Path
+import sys
+import time
+from types import SimpleNamespace
+
+from pelican import Pelican
+from pelican.generators import ArticlesGenerator, PagesGenerator
+from pelican.settings import read_settings
+from pelican.utils import slugify
+
+from .audit import LayoutAudit, save_audit
+from .cards_generator import CardsGenerator, file_mtime, rendered_cards
+from .preview import ContactSheet
+from .settings import PLUGIN_SETTINGS, populate_plugin_settings
+from .social_cards import audit_cards, generator_label, render_cards
+
+logger = logging.getLogger(__name__)
+
+WATCH_INTERVAL = 0.2
+DEFAULT_DRAFT_SCALE = 0.2
+# Exit status of audit command when some text doesn't fit on canvas
+OVERFLOW_EXIT_CODE = 2
+
+# Settings that make no sense when rendering cards on demand
+CLI_SETTINGS = {
+    "FORCE_SAVE": True,
+    "DEDUPLICATE": None,
+    "CLEANUP": None,
+    "MANIFEST": None,
+    "CACHE_DIR": None,
+    "WORKERS": 1,
+    "BACKGROUND": False,
+}
+
+
+class CardContent:
+    """Minimal stand-in for Pelican content object, built from input entry."""
+
+    def __init__(self, title, save_as=None, source_path="<cli>", **attributes):
+        self.title = title
+        self.save_as = save_as
+        self.source_path = source_path
+        self.metadata = {"title": title}
+        self.settings = {}
+        for name, value in attributes.items():
+            setattr(self, name, value)
+
+
+def parse_entries(text, input_format):
+    """Return list of entries (dicts with at least "title" key) in text."""
+    if input_format == "auto":
+        input_format = "json" if text.lstrip().startswith("[") else "lines"
+
+    if input_format == "json":
+        entries = json.loads(text)
+    elif input_format == "csv":
+        entries = list(csv.DictReader(io.StringIO(text)))
+    else:
+        entries = [line.strip() for line in text.splitlines() if line.strip()]
+
+    return [
+        entry if isinstance(entry, dict) else {"title": str(entry)} for entry in entries
+    ]
+
+
+def read_entries(args, stdin_text=None):
+    entries = [{"title": title} for title in args.titles]
+
+    if args.input and args.input != "-":
+        input_path = Path(args.input)
+        input_format = args.format
+        if input_format == "auto" and input_path.suffix.lower() in (".json", ".csv"):
+            input_format = input_path.suffix.lower()[1:]
+        entries.extend(
+            parse_entries(input_path.read_text(encoding="utf-8"), input_format)
+        )
+    elif stdin_text is not None:
+        entries.extend(parse_entries(stdin_text, args.format))
+
+    return entries
+
+
+def make_content(entry, slug_substitutions):
+    entry = dict(entry)
+    title = entry.pop("title", "")
+    if not entry.get("save_as"):
+        slug = slugify(title, regex_subs=slug_substitutions) or "card"
+        entry["save_as"] = f"{slug}.html"
+    return CardContent(title, **entry)
+
+
+def load_settings(args):
+    """Read Pelican configuration file and set up plugin settings.
+
+    Returns Pelican settings, or ``None`` if plugin is not configured.
+    """
+    override = {}
+    if args.draft:
+        override["SOCIAL_CARDS_DRAFT_SCALE"] = args.draft
+    try:
+        settings = read_settings(args.settings, override=override)
+    except (OSError, ValueError) as e:
+        logger.error(f"Can't read {args.settings}: {e}")  # noqa: TRY400
+        return None
+    populate_plugin_settings(SimpleNamespace(settings=settings))
+    if not PLUGIN_SETTINGS.get("configured"):
+        return None
+
+    PLUGIN_SETTINGS.update(CLI_SETTINGS)
+    PLUGIN_SETTINGS["PATH"] = Path(args.output).resolve()
+    return settings
+
+
+def render(args, entries, settings):
+    """Render cards for all entries, returning paths of saved files."""
+    start = time.perf_counter()
+    PLUGIN_SETTINGS["PATH"].mkdir(parents=True, exist_ok=True)
+    cards_generator = CardsGenerator()
+    # all requested cards are rendered, even if they didn't change
+    rendered_cards.clear()
+    slug_substitutions = settings.get("SLUG_REGEX_SUBSTITUTIONS", ())
+
+    cards = []
+    for entry in entries:
+        content = make_content(entry, slug_substitutions)
+        card = cards_generator.prepare_card(content)
+        if card is not None:
+            cards.append(card)
+
+    if args.contact_sheet:
+        saved_paths = render_contact_sheet(args, cards_generator, cards)
+    else:
+        render_cards(cards_generator, cards)
+        saved_paths = [card.target_path for card in cards]
+
+    logger.info(f"Rendered {len(cards)} cards in {time.perf_counter() - start:.2f}s")
+    return saved_paths
+
+
+def render_contact_sheet(args, cards_generator, cards):
+    """Draw cards and paste each of them on contact sheet.
+
+    Cards are not read back from disk, and with ``--sheet-only`` they are
+    not encoded at all.
+    """
+    saved_paths = []
+    sheet = None
+    for card in cards:
+        img, draw_seconds = cards_generator.draw_card(card, raster=True)
+        if sheet is None:
+            sheet = ContactSheet(len(cards), img.size, columns=args.columns)
+        sheet.add(img, card.target_path.name)
+        if not args.sheet_only:
+            encode_seconds = cards_generator.save_card(img, card)
+            cards_generator.record_rendered(card, draw_seconds, encode_seconds)
+            saved_paths.append(card.target_path)
+
+    if sheet is not None:
+        sheet_path = Path(args.contact_sheet)
+        sheet.save(sheet_path)
+        saved_paths.append(sheet_path)
+    return saved_paths
+
+
+def watched_files(args):
+    """Return paths of files that affect rendered cards."""
+    paths = [args.settings]
+    if args.input and args.input != "-":
+        paths.append(args.input)
+    if PLUGIN_SETTINGS.get("configured"):
+        paths.extend((PLUGIN_SETTINGS["FONT_FILENAME"], PLUGIN_SETTINGS["TEMPLATE"]))
+        for variant in PLUGIN_SETTINGS["VARIANTS"].values():
+            paths.extend((variant.get("FONT_FILENAME"), variant.get("TEMPLATE")))
+    return [path for path in paths if path]
+
+
+def watch(args, settings, stdin_text):
+    """Render cards again whenever configuration, font or template changes.
+
+    Cards generator notices by itself which of font and template files
+    have to be loaded again.
+    """
+    files = watched_files(args)
+    mtimes = [file_mtime(path) for path in files]
+    logger.warning("Watching for changes, press Ctrl+C to stop")
+
+    while True:
+        time.sleep(args.interval)
+        new_mtimes = [file_mtime(path) for path in files]
+        if new_mtimes == mtimes:
+            continue
+        mtimes = new_mtimes
+
+        new_settings = load_settings(args)
+        if new_settings is None:
+            continue
+        settings = new_settings
+
+        try:
+            render(args, read_entries(args, stdin_text), settings)
+        except Exception:
+            logger.exception("Rendering cards failed")
+
+        files = watched_files(args)
+        mtimes = [file_mtime(path) for path in files]
+
+
+def render_command(args):
+    stdin_text = None
+    if args.input == "-" or (not args.input and not args.titles):
+        stdin_text = sys.stdin.read()
+
+    settings = load_settings(args)
+    if settings is None:
+        return 1
+
+    entries = read_entries(args, stdin_text)
+    for saved_path in render(args, entries, settings):
+        print(saved_path)  # noqa: T201
+
+    if args.watch:
+        with contextlib.suppress(KeyboardInterrupt):
+            watch(args, settings, stdin_text)
+    return 0
+
+
+def audit_entries(entries, settings):
+    """Measure texts of cards for entries, returning ``LayoutAudit``."""
+    start = time.perf_counter()
+    cards_generator = CardsGenerator()
+    slug_substitutions = settings.get("SLUG_REGEX_SUBSTITUTIONS", ())
+    audit = LayoutAudit()
+    for entry in entries:
+        audit.check(cards_generator, make_content(entry, slug_substitutions))
+    audit.total_seconds = time.perf_counter() - start
+    return audit
+
+
+def audit_site(args):
+    """Read articles and pages of site, and measure texts of their cards.
+
+    Returns layout audits by generator label, or ``None`` if plugin is not
+    configured. Nothing is written to output directory.
+    """
+    try:
+        settings = read_settings(args.settings)
+    except (OSError, ValueError) as e:
+        logger.error(f"Can't read {args.settings}: {e}")  # noqa: TRY400
+        return None
+    pelican = Pelican(settings)
+    populate_plugin_settings(pelican)
+    if not PLUGIN_SETTINGS.get("configured"):
+        return None
+    # content is audited below, plugin must not generate cards while it's read
+    PLUGIN_SETTINGS["configured"] = False
+
+    context = settings.copy()
+    context["generated_content"] = {}
+    context["static_links"] = set()
+    context["static_content"] = {}
+    context["localsiteurl"] = settings["SITEURL"]
+
+    audits = {}
+    for generator_class in (ArticlesGenerator, PagesGenerator):
+        generator = generator_class(
+            context=context,
+            settings=settings,
+            path=pelican.path,
+            theme=pelican.theme,
+            output_path=pelican.output_path,
+        )
+        generator.generate_context()
+        audits[generator_label(generator)] = audit_cards(generator)
+    return audits
+
+
+def audit_command(args):
+    if args.titles or args.input:
+        stdin_text = sys.stdin.read() if args.input == "-" else None
+        settings = load_settings(args)
+        if settings is None:
+            return 1
+        audits = {"titles": audit_entries(read_entries(args, stdin_text), settings)}
+    else:
+        audits = audit_site(args)
+        if audits is None:
+            return 1
+
+    if args.json == "-":
+        data = {label: audit.as_dict() for label, audit in audits.items()}
+        print(json.dumps(data, indent=2))  # noqa: T201
+    else:
+        if args.json:
+            save_audit(args.json, audits)
+        for label, audit in audits.items():
+            print(audit.format_report(label))  # noqa: T201
+
+    if any(audit.overflowing for audit in audits.values()):
+        return OVERFLOW_EXIT_CODE
+    return 0
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog="pelican-social-cards",
+        description="Render social media cards without running Pelican build.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    render_parser = subparsers.add_parser(
+        "render",
+        help="render cards for given titles",
+        description=(
+            "Render cards for titles given as arguments, in JSON or CSV file, "
+            "or on standard input (one title per line, or JSON)."
+        ),
+    )
+    render_parser.add_argument("titles", nargs="*", help="titles of cards")
+    render_parser.add_argument(
+        "-s",
+        "--settings",
+        default="pelicanconf.py",
+        help="Pelican configuration file (default: %(default)s)",
+    )
+    render_parser.add_argument(
+        "-i",
+        "--input",
+        help=(
+            'file with list of titles, "-" for standard input. JSON file may '
+            "contain strings or objects, CSV file must have title column. Other "
+            "keys (save_as, og_image_text, category...) set attributes of content"
+        ),
+    )
+    render_parser.add_argument(
+        "-f",
+        "--format",
+        choices=("auto", "lines", "json", "csv"),
+        default="auto",
+        help="format of input (default: based on file extension)",
+    )
+    render_parser.add_argument(
+        "-o",
+        "--output",
+        default=".",
+        help="directory to save cards in (default: current directory)",
+    )
+    render_parser.add_argument(
+        "-d",
+        "--draft",
+        nargs="?",
+        type=float,
+        const=DEFAULT_DRAFT_SCALE,
+        metavar="SCALE",
+        help=(
+            "render low resolution cards quickly, scaled down by given factor "
+            "(default: %(const)s)"
+        ),
+    )
+    render_parser.add_argument(
+        "-c",
+        "--contact-sheet",
+        metavar="FILE",
+        help="also save single image with grid of all rendered cards",
+    )
+    render_parser.add_argument(
+        "--sheet-only",
+        action="store_true",
+        help="save only contact sheet, without individual cards",
+    )
+    render_parser.add_argument(
+        "--columns",
+        type=int,
+        help="number of columns of contact sheet (default: grid is square)",
+    )
+    render_parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="render cards again when configuration, font or template changes",
+    )
+    render_parser.add_argument(
+        "--interval",
+        type=float,
+        default=WATCH_INTERVAL,
+        help="how often to check for changes, in seconds (default: %(default)s)",
+    )
+    render_parser.add_argument(
+        "-v", "--verbose", action="store_true", help="show more messages"
+    )
+    render_parser.set_defaults(handler=render_command)
+
+    audit_parser = subparsers.add_parser(
+        "audit",
+        help="report texts that don't fit on canvas, without rendering cards",
+        description=(
+            "Wrap and measure texts of cards for all articles and pages of site, "
+            "or for given titles, and report those that don't fit on canvas. "
+            "Nothing is drawn or saved. Exit status is 2 if any text overflows."
+        ),
+    )
+    audit_parser.add_argument(
+        "titles", nargs="*", help="titles of cards (default: all site content)"
+    )
+    audit_parser.add_argument(
+        "-s",
+        "--settings",
+        default="pelicanconf.py",
+        help="Pelican configuration file (default: %(default)s)",
+    )
+    audit_parser.add_argument(
+        "-i",
+        "--input",
+        help='file with list of titles, "-" for standard input, like for render',
+    )
+    audit_parser.add_argument(
+        "-f",
+        "--format",
+        choices=("auto", "lines", "json", "csv"),
+        default="auto",
+        help="format of input (default: based on file extension)",
+    )
+    audit_parser.add_argument(
+        "--json",
+        metavar="FILE",
+        help='also save report as JSON, "-" to print only JSON report',
+    )
+    audit_parser.add_argument(
+        "-v", "--verbose", action="store_true", help="show more messages"
+    )
+    audit_parser.set_defaults(handler=audit_command, draft=None, output=".")
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(message)s",
+    )
+    if not args.verbose:
+        # warnings about settings irrelevant for cards, like feeds
+        logging.getLogger("pelican.settings").setLevel(logging.ERROR)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import hashlib
+import os
+from pathlib import Path
+
+from .settings import PLUGIN_SETTINGS
+from .storage import load_json_state, save_json_state
+
+MANIFEST_VERSION = 1
+
+
+def file_digest(path):
+    """Return SHA-256 hex digest of file contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CardsManifest:
+    """Persistent record of fingerprints of already generated cards."""
+
+    def __init__(self, path):
+        self._path = Path(path)
+        self._entries = {}
+        self._changed = False
+
+        self._load()
+
+    def _load(self):
+        data = load_json_state(self._path, MANIFEST_VERSION, "manifest")
+        if data is not None:
+            self._entries = data.get("cards", {})
+
+    def _key(self, card_path):
+        return Path(os.path.relpath(card_path, PLUGIN_SETTINGS["PATH"])).as_posix()
+
+    def is_current(self, card_path, fingerprint):
+        """Check if card was generated from data with given fingerprint."""
+        return self._entries.get(self._key(card_path)) == fingerprint
+
+    def update(self, card_path, fingerprint):
+        """Record fingerprint of data used to generate card."""
+        key = self._key(card_path)
+        if self._entries.get(key) != fingerprint:
+            self._entries[key] = fingerprint
+            self._changed = True
+
+    def discard(self, card_path):
+        """Forget card that was removed from disk."""
+        if self._entries.pop(self._key(card_path), None) is not None:
+            self._changed = True
+
+    def save(self):
+        """Write manifest to disk, if anything has changed."""
+        if not self._changed:
+            return
+
+        data = {"version": MANIFEST_VERSION, "cards": self._entries}
+        save_json_state(self._path, data, indent=0)
+        self._changed = False
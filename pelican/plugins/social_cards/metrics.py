@@ -0,0 +1,101 @@
+from collections import OrderedDict
+from pathlib import Path
+import threading
+
+from .manifest import file_digest
+from .storage import load_json_state, save_json_state
+
+METRICS_CACHE_VERSION = 1
+METRICS_CACHE_SIZE = 50000
+
+
+class LineMetricsCache:
+    """Bounded LRU cache of bounding boxes of lines of text.
+
+    Entries are keyed by font file contents, font size and line of text,
+    so they stay valid between builds, as long as font file is the same.
+    Cache may be used by thread rendering cards in background, while cards
+    of other content are prepared.
+    """
+
+    def __init__(self, maxsize=METRICS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._font_keys = {}
+        self._loaded_paths = set()
+        self._changed = False
+
+    def _font_key(self, font):
+        font_path = getattr(font, "path", None)
+        if not isinstance(font_path, (str, Path)):
+            return None
+
+        lookup_key = (font_path, font.size)
+        if lookup_key not in self._font_keys:
+            self._font_keys[lookup_key] = f"{file_digest(font_path)}:{font.size}"
+        return self._font_keys[lookup_key]
+
+    def getbbox(self, font, line):
+        """Return ``font.getbbox(line)``, measuring line only if necessary."""
+        font_key = self._font_key(font)
+        if font_key is None:
+            return font.getbbox(line)
+
+        key = (font_key, line)
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            except KeyError:
+                pass
+
+        bbox = tuple(font.getbbox(line))
+        with self._lock:
+            self._entries[key] = bbox
+            self._changed = True
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return bbox
+
+    def forget_fonts(self):
+        """Read font files again, in case they have changed."""
+        self._font_keys.clear()
+
+    def clear(self):  # noqa: D102
+        with self._lock:
+            self._entries.clear()
+            self._changed = False
+        self._font_keys.clear()
+        self._loaded_paths.clear()
+
+    def load(self, path):
+        """Add entries stored in file to cache."""
+        if path in self._loaded_paths:
+            return
+        self._loaded_paths.add(path)
+
+        data = load_json_state(path, METRICS_CACHE_VERSION, "metrics cache")
+        if data is None:
+            return
+
+        with self._lock:
+            for font_key, line, bbox in data.get("entries", [])[-self.maxsize :]:
+                self._entries.setdefault((font_key, line), tuple(bbox))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def save(self, path):
+        """Write cache to file, if anything has changed since it was loaded."""
+        with self._lock:
+            if not self._changed:
+                return
+            entries = [
+                [font_key, line, bbox]
+                for (font_key, line), bbox in self._entries.items()
+            ]
+            self._changed = False
+        save_json_state(path, {"version": METRICS_CACHE_VERSION, "entries": entries})
+
+
+line_metrics = LineMetricsCache()
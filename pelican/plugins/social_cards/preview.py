@@ -0,0 +1,73 @@
+import math
+
+from PIL import Image, ImageDraw, ImageFont
+
+from .settings import DRAFT_SAVE_OPTIONS
+
+CONTACT_SHEET_THUMBNAIL_WIDTH = 240
+CONTACT_SHEET_CAPTION_HEIGHT = 12
+CONTACT_SHEET_MARGIN = 4
+# Approximate width of character of default bitmap font
+CONTACT_SHEET_CHAR_WIDTH = 6
+
+
+class ContactSheet:
+    """Single image with grid of cards, each with caption below it.
+
+    Cards wider than ``thumbnail_width`` are scaled down. By default grid
+    is roughly square.
+    """
+
+    def __init__(self, count, card_size, columns=None, thumbnail_width=None):
+        card_width, card_height = card_size
+        self.thumbnail_width = min(
+            thumbnail_width or CONTACT_SHEET_THUMBNAIL_WIDTH, card_width
+        )
+        self.thumbnail_height = max(
+            round(card_height * self.thumbnail_width / card_width), 1
+        )
+        self.columns = max(columns or math.ceil(math.sqrt(count)), 1)
+        rows = max(math.ceil(count / self.columns), 1)
+
+        self._cell_width = self.thumbnail_width + CONTACT_SHEET_MARGIN
+        self._cell_height = (
+            self.thumbnail_height + CONTACT_SHEET_CAPTION_HEIGHT + CONTACT_SHEET_MARGIN
+        )
+        self.image = Image.new(
+            "RGB",
+            (
+                self.columns * self._cell_width + CONTACT_SHEET_MARGIN,
+                rows * self._cell_height + CONTACT_SHEET_MARGIN,
+            ),
+            "#ffffff",
+        )
+        self._draw = ImageDraw.Draw(self.image)
+        self._font = ImageFont.load_default_imagefont()
+        self._count = 0
+
+    def add(self, card, caption=""):
+        """Paste card image in the next cell of grid."""
+        x = (self._count % self.columns) * self._cell_width + CONTACT_SHEET_MARGIN
+        y = (self._count // self.columns) * self._cell_height + CONTACT_SHEET_MARGIN
+        self._count += 1
+
+        thumbnail_size = (self.thumbnail_width, self.thumbnail_height)
+        if card.size != thumbnail_size:
+            card = card.resize(thumbnail_size, Image.Resampling.BILINEAR)
+        if card.mode != "RGB":
+            card = card.convert("RGB")
+        self.image.paste(card, (x, y))
+
+        max_length = max(self.thumbnail_width // CONTACT_SHEET_CHAR_WIDTH, 1)
+        self._draw.text(
+            (x, y + self.thumbnail_height + 1),
+            caption[:max_length],
+            font=self._font,
+            fill="#000000",
+        )
+
+    def save(self, path):
+        """Save contact sheet, using fast encoder options."""
+        extension = path.suffix.lower().lstrip(".")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.image.save(path, **DRAFT_SAVE_OPTIONS.get(extension, {}))
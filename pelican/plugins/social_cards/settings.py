@@ -1,20 +1,38 @@
+import contextlib
 import logging
+import os
 from pathlib import Path
 import textwrap
 
+from PIL import Image
+
+from .svg import is_svg
+
 logger = logging.getLogger(__name__)
 
 PLUGIN_SETTINGS = {}
 
 DEFAULT_SETTINGS = {
     "TEMPLATE": None,
+    "VARIANTS": {},
+    "CATEGORY_VARIANTS": {},
+    "TAG_VARIANTS": {},
+    "TEMPLATE_CACHE_SIZE": 8,
     "PATH": "social-cards/",
     "FORMAT_EXTENSION": "png",
+    "SAVE_OPTIONS": {},
+    "QUANTIZE_COLORS": 0,
+    "PROFILES": {},
+    "SVG_TEMPLATE": "embed",
     "FONT_FILENAME": "Arial.ttf",
     "FONT_SIZE": 70,
     "FONT_FILL": "#000000",
     "FONT_OUTLINE_SIZE": 0,
     "FONT_OUTLINE_FILL": "#000000",
+    "FONT_OUTLINE_METHOD": "stroke",
+    "SHADOW_OFFSET": None,
+    "SHADOW_BLUR": 0,
+    "SHADOW_FILL": "#00000080",
     "CANVAS_WIDTH": 1200,
     "CANVAS_HEIGHT": 630,
     "CANVAS_LEFT": 0,
@@ -24,6 +42,8 @@ DEFAULT_SETTINGS = {
     "LEADING": 15,
     "WRAPPING_FUNCTION": textwrap.wrap,
     "CHARS_PER_LINE": 30,
+    "AUTO_FIT": False,
+    "MIN_FONT_SIZE": 30,
     "KEY_NAME": "og_image",
     "INCLUDE_SERIES": False,
     "SERIES_FORMAT": "{}: ",
@@ -31,14 +51,115 @@ DEFAULT_SETTINGS = {
     "INCLUDE_DRAFTS": False,
     "INCLUDE_HIDDEN": False,
     "FORCE_SAVE": False,
+    "DEDUPLICATE": None,
+    "CLEANUP": None,
+    "MANIFEST": None,
+    "CACHE_DIR": None,
+    "CACHE_SIZE_LIMIT": 1024,
+    "WORKERS": 1,
+    "ENCODER_THREADS": 0,
+    "BACKGROUND": False,
+    "MEMORY_BUDGET": 0,
+    "METRICS_CACHE": None,
+    "STATS_FILE": None,
+    "AUDIT": None,
+    "DRAFT_SCALE": None,
     "configured": False,
 }
 
 MANDATORY_SETTINGS = ["TEMPLATE"]
+# Settings that have an impact on how the card looks
+VISUAL_SETTINGS = (
+    "FORMAT_EXTENSION",
+    "SAVE_OPTIONS",
+    "QUANTIZE_COLORS",
+    "PROFILES",
+    "SVG_TEMPLATE",
+    "FONT_SIZE",
+    "FONT_FILL",
+    "FONT_OUTLINE_SIZE",
+    "FONT_OUTLINE_FILL",
+    "FONT_OUTLINE_METHOD",
+    "SHADOW_OFFSET",
+    "SHADOW_BLUR",
+    "SHADOW_FILL",
+    "CANVAS_WIDTH",
+    "CANVAS_HEIGHT",
+    "CANVAS_LEFT",
+    "CANVAS_TOP",
+    "HORIZONTAL_ALIGNMENT",
+    "VERTICAL_ALIGNMENT",
+    "LEADING",
+    "AUTO_FIT",
+    "DRAFT_SCALE",
+)
+# Settings given in pixels, that are scaled down in draft mode
+DRAFT_SCALED_SETTINGS = (
+    "FONT_SIZE",
+    "MIN_FONT_SIZE",
+    "FONT_OUTLINE_SIZE",
+    "SHADOW_BLUR",
+    "CANVAS_WIDTH",
+    "CANVAS_HEIGHT",
+    "CANVAS_LEFT",
+    "CANVAS_TOP",
+    "LEADING",
+)
+# Fast encoder options used in draft mode, by file extension
+DRAFT_SAVE_OPTIONS = {
+    "png": {"compress_level": 1},
+    "jpg": {"quality": 60},
+    "jpeg": {"quality": 60},
+    "webp": {"quality": 60, "method": 0},
+    "avif": {"quality": 50, "speed": 10},
+}
 VALID_ALIGNMENTS = {
     "VERTICAL": ("top", "center", "bottom"),
     "HORIZONTAL": ("left", "center", "right"),
 }
+VALID_DEDUPLICATE = (None, "link", "share")
+VALID_CLEANUP = (None, "report", "remove")
+VALID_OUTLINE_METHODS = ("stroke", "mask")
+VALID_SVG_TEMPLATE = ("embed", "link")
+# Formats that can store images with palette, which cards are quantized to
+PALETTE_FORMATS = ("PNG", "GIF", "WEBP")
+VALID_CHOICES = {
+    "DEDUPLICATE": VALID_DEDUPLICATE,
+    "CLEANUP": VALID_CLEANUP,
+    "FONT_OUTLINE_METHOD": VALID_OUTLINE_METHODS,
+    "SVG_TEMPLATE": VALID_SVG_TEMPLATE,
+}
+
+
+def registered_extensions():
+    """Return Pillow image formats by file extension.
+
+    AVIF plugin is loaded if Pillow doesn't support AVIF on its own.
+    """
+    extensions = Image.registered_extensions()
+    if ".avif" not in extensions:
+        with contextlib.suppress(ImportError):
+            import pillow_avif  # noqa: F401,PLC0415
+
+            extensions = Image.registered_extensions()
+    return extensions
+
+
+def can_save_format(extension, setting_name):
+    """Check if cards can be saved with given extension, logging error if not."""
+    if is_svg(extension):
+        return True
+    extension = f".{extension}".lower()
+    if registered_extensions().get(extension) in Image.SAVE:
+        return True
+
+    hint = ""
+    if extension == ".avif":
+        hint = " Upgrade Pillow to 11.3 or newer, or install pillow-avif-plugin."
+    logger.error(
+        f"{setting_name}: Pillow can't save images in {extension} format.{hint}"
+    )
+    return False
 
 
 def populate_plugin_settings(pelican_instance):
@@ -61,8 +182,7 @@ def populate_plugin_settings(pelican_instance):
 
     PLUGIN_SETTINGS["configured"] = True
 
-    content_path = Path(pelican_instance.settings.get("PATH"))
-    PLUGIN_SETTINGS["PATH"] = content_path / PLUGIN_SETTINGS["PATH"]
+    resolve_paths(Path(pelican_instance.settings.get("PATH")))
 
     int_settings = [
         key for key, value in DEFAULT_SETTINGS.items() if isinstance(value, int)
@@ -83,4 +203,132 @@ def populate_plugin_settings(pelican_instance):
             default_value = DEFAULT_SETTINGS.get(f"{key}_ALIGNMENT")
             PLUGIN_SETTINGS[f"{key}_ALIGNMENT"] = default_value
 
+    for key, valid_values in VALID_CHOICES.items():
+        if PLUGIN_SETTINGS[key] not in valid_values:
+            choices = ", ".join(
+                f'"{value}"' if isinstance(value, str) else str(value)
+                for value in valid_values
+            )
+            logger.error(f"SOCIAL_CARDS_{key} must be one of: {choices}")
+            PLUGIN_SETTINGS[key] = DEFAULT_SETTINGS[key]
+
+    PLUGIN_SETTINGS["SHADOW_OFFSET"] = validate_shadow_offset(
+        PLUGIN_SETTINGS["SHADOW_OFFSET"]
+    )
+    if not can_save_format(
+        PLUGIN_SETTINGS["FORMAT_EXTENSION"], "SOCIAL_CARDS_FORMAT_EXTENSION"
+    ):
+        PLUGIN_SETTINGS["FORMAT_EXTENSION"] = DEFAULT_SETTINGS["FORMAT_EXTENSION"]
+    PLUGIN_SETTINGS["PROFILES"] = validate_profiles(PLUGIN_SETTINGS["PROFILES"])
+
+    if PLUGIN_SETTINGS["DRAFT_SCALE"] is not None:
+        apply_draft_scale()
+    check_quantized_formats()
+
     logger.debug(f"pelican.plugins.social_cards settings: {PLUGIN_SETTINGS}")
+
+
+def resolve_paths(content_path):
+    """Make paths given in settings relative to Pelican content path."""
+    PLUGIN_SETTINGS["PATH"] = content_path / PLUGIN_SETTINGS["PATH"]
+    for key in ("MANIFEST", "METRICS_CACHE", "CACHE_DIR", "STATS_FILE"):
+        if PLUGIN_SETTINGS[key]:
+            PLUGIN_SETTINGS[key] = (
+                content_path / Path(PLUGIN_SETTINGS[key]).expanduser()
+            )
+    # audit may also be enabled without saving report
+    if isinstance(PLUGIN_SETTINGS["AUDIT"], (str, os.PathLike)):
+        PLUGIN_SETTINGS["AUDIT"] = (
+            content_path / Path(PLUGIN_SETTINGS["AUDIT"]).expanduser()
+        )
+
+
+def check_quantized_formats():
+    """Warn about output formats that cards can't be quantized for."""
+    if not PLUGIN_SETTINGS["QUANTIZE_COLORS"]:
+        return
+    extensions = {PLUGIN_SETTINGS["FORMAT_EXTENSION"].lower()} | {
+        profile["FORMAT_EXTENSION"].lower()
+        for profile in PLUGIN_SETTINGS["PROFILES"].values()
+    }
+    for extension in sorted(extensions):
+        image_format = registered_extensions().get(f".{extension}")
+        if not is_svg(extension) and image_format not in PALETTE_FORMATS:
+            logger.warning(
+                f"SOCIAL_CARDS_QUANTIZE_COLORS: .{extension} images can't have "
+                f"palette, colors are not reduced for them"
+            )
+
+
+def apply_draft_scale():
+    """Scale down settings given in pixels and use fast encoder options."""
+    try:
+        scale = float(PLUGIN_SETTINGS["DRAFT_SCALE"])
+    except (TypeError, ValueError):
+        scale = 0
+    if not 0 < scale <= 1:
+        logger.error("SOCIAL_CARDS_DRAFT_SCALE must be a number between 0 and 1")
+        PLUGIN_SETTINGS["DRAFT_SCALE"] = DEFAULT_SETTINGS["DRAFT_SCALE"]
+        return
+
+    PLUGIN_SETTINGS["DRAFT_SCALE"] = scale
+    for key in DRAFT_SCALED_SETTINGS:
+        PLUGIN_SETTINGS[key] = round(PLUGIN_SETTINGS[key] * scale)
+    for key in ("FONT_SIZE", "MIN_FONT_SIZE"):
+        PLUGIN_SETTINGS[key] = max(PLUGIN_SETTINGS[key], 1)
+
+    if PLUGIN_SETTINGS["SHADOW_OFFSET"] is not None:
+        x, y = PLUGIN_SETTINGS["SHADOW_OFFSET"]
+        PLUGIN_SETTINGS["SHADOW_OFFSET"] = (round(x * scale), round(y * scale))
+
+    for profile in PLUGIN_SETTINGS["PROFILES"].values():
+        width, height = profile["SIZE"]
+        profile["SIZE"] = (max(round(width * scale), 1), max(round(height * scale), 1))
+
+    extensions = [PLUGIN_SETTINGS["FORMAT_EXTENSION"]] + [
+        profile["FORMAT_EXTENSION"] for profile in PLUGIN_SETTINGS["PROFILES"].values()
+    ]
+    PLUGIN_SETTINGS["SAVE_OPTIONS"] = {
+        extension.lower(): DRAFT_SAVE_OPTIONS.get(extension.lower(), {})
+        for extension in extensions
+    }
+    PLUGIN_SETTINGS["QUANTIZE_COLORS"] = 0
+
+
+def validate_shadow_offset(offset):
+    if offset is None:
+        return None
+    try:
+        x, y = (int(value) for value in offset)
+    except (TypeError, ValueError):
+        logger.error("SOCIAL_CARDS_SHADOW_OFFSET must be a pair of numbers")  # noqa: TRY400
+        return None
+    return (x, y)
+
+
+def validate_profiles(profiles):
+    """Return output profiles with missing values filled in.
+
+    Profiles with invalid size, or format that Pillow can't save, are
+    skipped.
+    """
+    valid_profiles = {}
+    for key_name, profile in profiles.items():
+        try:
+            width, height = (int(value) for value in profile["SIZE"])
+        except (KeyError, TypeError, ValueError):
+            width = height = 0
+        if width <= 0 or height <= 0 or key_name == PLUGIN_SETTINGS["KEY_NAME"]:
+            logger.error(
+                f"SOCIAL_CARDS_PROFILES: {key_name} must have SIZE with positive "
+                f"width and height, and key different than SOCIAL_CARDS_KEY_NAME"
+            )
+            continue
+        extension = profile.get("FORMAT_EXTENSION", PLUGIN_SETTINGS["FORMAT_EXTENSION"])
+        if not can_save_format(extension, f"SOCIAL_CARDS_PROFILES: {key_name}"):
+            continue
+        valid_profiles[key_name] = {
+            "SIZE": (width, height),
+            "FORMAT_EXTENSION": extension,
+        }
+    return valid_profiles
@@ -3,18 +3,46 @@
 Plugin to generate social media cards with post title embedded
 """  # noqa: D400,D415
 
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
 import itertools
 import logging
+import os
 from pathlib import Path
+import time
 
 from pelican import signals
 from pelican.generators import ArticlesGenerator, PagesGenerator, StaticGenerator
 
-from .cards_generator import CardsGenerator
+from .audit import LayoutAudit, save_audit
+from .cache import CardsCache
+from .cards_generator import CardsGenerator, get_profile_paths, needs_raster_output
+from .manifest import CardsManifest
+from .metrics import line_metrics
 from .settings import PLUGIN_SETTINGS, populate_plugin_settings
+from .stats import save_stats
+from .workers import get_workers_count, render_in_pool, render_pipelined
 
 logger = logging.getLogger(__name__)
 
+# Stats of the most recent run of generate_cards, for each generator
+generators_stats = {}
+
+# Layout audits of the most recent run of generate_cards, for each generator
+generators_audits = {}
+
+# Content objects that got card in current build, keyed by card source path
+cards_index = {}
+
+# Cards being rendered in background, with futures of their rendering
+background_jobs = []
+_background_executor = None
+
+CardsJob = namedtuple(
+    "CardsJob",
+    ["generator", "cards_generator", "manifest", "cache", "card_sources", "start"],
+)
+
 
 def is_plugin_configured():
     return PLUGIN_SETTINGS.get("configured", False)
@@ -40,18 +68,339 @@ def generator_content(generator):
     yield from itertools.chain(*all_content)
 
 
+def generator_label(generator):
+    if isinstance(generator, ArticlesGenerator):
+        return "articles"
+    if isinstance(generator, PagesGenerator):
+        return "pages"
+    return type(generator).__name__
+
+
+def index_card(content_object):
+    key = getattr(content_object, f"{PLUGIN_SETTINGS['KEY_NAME']}_source", None)
+    if key:
+        cards_index.setdefault(key, []).append(content_object)
+
+
+def deduplicate_cards(cards):
+    """Split cards into unique ones and duplicates of them.
+
+    Duplicates are returned as (card, card with the same image) pairs.
+    """
+    unique_cards = {}
+    duplicates = []
+    for card in cards:
+        key = card.fingerprint or card.target_path
+        if key in unique_cards:
+            duplicates.append((card, unique_cards[key]))
+        else:
+            unique_cards[key] = card
+    return list(unique_cards.values()), duplicates
+
+
+def restore_cached_cards(cards_generator, cards):
+    """Put cards that are in cache in place, returning the other ones."""
+    uncached_cards = []
+    for card in cards:
+        if cards_generator.restore_card(card):
+            cards_generator.commit_card(card)
+        else:
+            uncached_cards.append(card)
+    return uncached_cards
+
+
+def render_cards(cards_generator, cards):
+    duplicates = []
+    if PLUGIN_SETTINGS["DEDUPLICATE"]:
+        cards, duplicates = deduplicate_cards(cards)
+
+    if PLUGIN_SETTINGS["CACHE_DIR"]:
+        cards = restore_cached_cards(cards_generator, cards)
+
+    # cards using the same template are rendered one after another
+    cards.sort(key=lambda card: card.variant or "")
+
+    # SVG cards are only formatted text, other threads wouldn't speed that up
+    parallel = needs_raster_output() and len(cards) > 1
+    workers = get_workers_count()
+    if parallel and workers > 1:
+        for card in render_in_pool(cards_generator, cards, workers):
+            cards_generator.commit_card(card)
+    elif parallel and PLUGIN_SETTINGS["ENCODER_THREADS"] > 0:
+        threads = PLUGIN_SETTINGS["ENCODER_THREADS"]
+        for card in render_pipelined(cards_generator, cards, threads):
+            cards_generator.commit_card(card)
+    else:
+        for card in cards:
+            cards_generator.render_card(card)
+            cards_generator.commit_card(card)
+    cards_generator.release_images()
+
+    for card, source_card in duplicates:
+        if card.target_path != source_card.target_path:
+            cards_generator.link_card(card, source_card)
+        cards_generator.commit_card(card)
+
+
+def card_files(card_source):
+    """Return source paths of card in all sizes, by metadata key name."""
+    profile_paths = get_profile_paths(Path(card_source))
+    return {
+        PLUGIN_SETTINGS["KEY_NAME"]: card_source,
+        **{key_name: path.as_posix() for key_name, path in profile_paths.items()},
+    }
+
+
+def find_orphaned_cards(card_sources):
+    """Return card files that no content object of current build uses."""
+    used_files = set()
+    for card_source in card_sources:
+        used_files.update(card_files(card_source).values())
+
+    extensions = {PLUGIN_SETTINGS["FORMAT_EXTENSION"]} | {
+        profile["FORMAT_EXTENSION"] for profile in PLUGIN_SETTINGS["PROFILES"].values()
+    }
+    return sorted(
+        path
+        for extension in extensions
+        for path in PLUGIN_SETTINGS["PATH"].rglob(f"*.{extension}")
+        if path.as_posix() not in used_files
+    )
+
+
+def cleanup_cards(stats, card_sources):
+    """Report or remove orphaned cards, depending on settings."""
+    orphaned_cards = find_orphaned_cards(card_sources)
+    stats.count("orphaned", len(orphaned_cards))
+
+    if PLUGIN_SETTINGS["CLEANUP"] == "report":
+        for card_path in orphaned_cards:
+            logger.warning(
+                f"pelican.plugins.social_cards: {card_path} is not used by any "
+                f"article or page"
+            )
+        return
+
+    manifest = None
+    if PLUGIN_SETTINGS["MANIFEST"]:
+        manifest = CardsManifest(PLUGIN_SETTINGS["MANIFEST"])
+
+    for card_path in orphaned_cards:
+        logger.info(f"pelican.plugins.social_cards: Removing unused {card_path}")
+        card_path.unlink(missing_ok=True)
+        if manifest is not None:
+            manifest.discard(card_path)
+        for directory in card_path.parents:
+            if directory == PLUGIN_SETTINGS["PATH"] or any(directory.iterdir()):
+                break
+            directory.rmdir()
+
+    if manifest is not None:
+        manifest.save()
+
+
+def record_stats(generator, stats):
+    label = generator_label(generator)
+    generators_stats[label] = stats
+    stats.log_summary(label)
+    if PLUGIN_SETTINGS["STATS_FILE"]:
+        save_stats(PLUGIN_SETTINGS["STATS_FILE"], generators_stats)
+
+
+def audit_cards(generator):
+    """Measure texts of cards for all content, without generating cards."""
+    start = time.perf_counter()
+    cards_generator = CardsGenerator()
+    audit = LayoutAudit()
+    for content_object in generator_content(generator):
+        if not should_skip_object(content_object):
+            audit.check(cards_generator, content_object)
+    audit.total_seconds = time.perf_counter() - start
+    return audit
+
+
+def record_audit(generator, audit):
+    label = generator_label(generator)
+    generators_audits[label] = audit
+    if audit.overflowing:
+        logger.warning(f"pelican.plugins.social_cards: {audit.format_report(label)}")
+    else:
+        logger.info(
+            f"pelican.plugins.social_cards: Text of all {audit.checked} {label} "
+            f"cards fits on canvas"
+        )
+    if isinstance(PLUGIN_SETTINGS["AUDIT"], (str, os.PathLike)):
+        save_audit(PLUGIN_SETTINGS["AUDIT"], generators_audits)
+
+
 def generate_cards(generator):
     if not is_plugin_configured():
         return
+    if PLUGIN_SETTINGS["AUDIT"]:
+        record_audit(generator, audit_cards(generator))
+        return
 
+    start = time.perf_counter()
     PLUGIN_SETTINGS["PATH"].mkdir(parents=True, exist_ok=True)
 
-    cards_generator = CardsGenerator()
+    manifest = cache = None
+    if background_jobs:
+        # cards of previous generator may still be committed to them
+        manifest, cache = background_jobs[-1][0].manifest, background_jobs[-1][0].cache
+    else:
+        if PLUGIN_SETTINGS["MANIFEST"]:
+            manifest = CardsManifest(PLUGIN_SETTINGS["MANIFEST"])
+        if PLUGIN_SETTINGS["CACHE_DIR"]:
+            cache = CardsCache(
+                PLUGIN_SETTINGS["CACHE_DIR"],
+                PLUGIN_SETTINGS["CACHE_SIZE_LIMIT"] * 1024 * 1024,
+            )
+
+    if PLUGIN_SETTINGS["METRICS_CACHE"]:
+        line_metrics.load(PLUGIN_SETTINGS["METRICS_CACHE"])
+
+    cards_generator = CardsGenerator(manifest=manifest, cache=cache)
+    stats = cards_generator.stats
 
+    cards = []
     for content_object in generator_content(generator):
         if should_skip_object(content_object):
+            stats.count("skipped_by_key")
             continue
-        cards_generator.create_for_object(content_object)
+        card = cards_generator.prepare_card(content_object)
+        index_card(content_object)
+        if card is not None:
+            cards.append(card)
+
+    job = CardsJob(
+        generator, cards_generator, manifest, cache, list(cards_index), start
+    )
+    if PLUGIN_SETTINGS["BACKGROUND"]:
+        link_pending_cards(generator, cards)
+        future = get_background_executor().submit(render_job, job, cards)
+        background_jobs.append((job, future))
+        return
+
+    finish_job(job, render_job(job, cards))
+
+
+def render_job(job, cards):
+    """Render cards, returning time when it was finished."""
+    render_cards(job.cards_generator, cards)
+    return time.perf_counter()
+
+
+def finish_job(job, end):
+    """Save state of cards generation, and report stats."""
+    if job.manifest is not None:
+        job.manifest.save()
+    if job.cache is not None:
+        job.cache.save()
+    if PLUGIN_SETTINGS["METRICS_CACHE"]:
+        line_metrics.save(PLUGIN_SETTINGS["METRICS_CACHE"])
+
+    stats = job.cards_generator.stats
+    # pages are processed after articles, so all cards are known by now
+    if PLUGIN_SETTINGS["CLEANUP"] and isinstance(job.generator, PagesGenerator):
+        cleanup_cards(stats, job.card_sources)
+
+    stats.total_seconds = end - job.start
+    stats.record_peak_memory()
+    record_stats(job.generator, stats)
+
+
+def get_background_executor():
+    global _background_executor  # noqa: PLW0603
+    if _background_executor is None:
+        _background_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="social-cards"
+        )
+    return _background_executor
+
+
+def link_pending_cards(generator, cards):
+    """Make Pelican copy cards that are still being rendered in background.
+
+    Pelican looks for static files before rendering ends, so cards that
+    don't exist yet are added to static links in Pelican context.
+    """
+    context = getattr(generator, "context", None)
+    if context is None or "static_links" not in context:
+        return
+
+    content_path = generator.settings["PATH"]
+    static_paths = [
+        Path(os.path.normpath(path)).as_posix()
+        for path in generator.settings.get("STATIC_PATHS", [])
+    ]
+    for card in cards:
+        for source_path in card_files(card.target_path.as_posix()).values():
+            location = Path(os.path.relpath(source_path, content_path)).as_posix()
+            if any(
+                path in (os.curdir, location) or location.startswith(f"{path}/")
+                for path in static_paths
+            ):
+                context["static_links"].add(location)
+
+
+def wait_for_cards(*args):
+    """Wait until cards rendered in background are saved."""
+    jobs = background_jobs[:]
+    background_jobs.clear()
+    # jobs share manifest, cache and line metrics, which are saved only
+    # once none of the jobs is rendering cards anymore
+    wait([future for _, future in jobs])
+    for job, future in jobs:
+        finish_job(job, future.result())
+
+
+class BackgroundCardsWaiter:
+    """Pelican generator that waits for cards rendered in background.
+
+    Output of generators added by plugins is written after articles and
+    pages, but before static files are copied, so cards are rendered
+    while Pelican renders theme templates.
+    """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def generate_output(self, writer):  # noqa: D102
+        wait_for_cards()
+
+
+def get_generators(pelican_instance):
+    # cards of previous build that failed before they were waited for
+    wait_for_cards()
+    if is_plugin_configured() and PLUGIN_SETTINGS["BACKGROUND"]:
+        return BackgroundCardsWaiter
+    return None
+
+
+def find_static_cards(static_generator, card_sources):
+    """Map source paths of cards to their output paths.
+
+    Cards are looked up by key in static content of Pelican context, so
+    this doesn't depend on the number of other static files. If context
+    is not available, static files are filtered by directory of cards.
+    """
+    static_content = getattr(static_generator, "context", {}).get("static_content")
+    if static_content is not None:
+        content_path = static_generator.settings["PATH"]
+        card_paths_map = {}
+        for card_source in card_sources:
+            location = Path(os.path.relpath(card_source, content_path)).as_posix()
+            static_file = static_content.get(location)
+            if static_file is not None:
+                card_paths_map[card_source] = static_file.save_as
+        return card_paths_map
+
+    cards_prefix = f"{PLUGIN_SETTINGS['PATH'].as_posix()}/"
+    return {
+        static_file.source_path: static_file.save_as
+        for static_file in static_generator.staticfiles
+        if static_file.source_path.startswith(cards_prefix)
+    }
 
 
 def attach_metadata(finished_generators):
@@ -61,36 +410,40 @@ def attach_metadata(finished_generators):
     for generator in finished_generators:
         if isinstance(generator, ArticlesGenerator):
             articles_generator = generator
-        if isinstance(generator, PagesGenerator):
-            pages_generator = generator
         if isinstance(generator, StaticGenerator):
             static_generator = generator
 
-    card_paths_map = {
-        static_file.source_path: static_file.save_as
-        for static_file in static_generator.staticfiles
-        if Path(static_file.source_path).is_relative_to(PLUGIN_SETTINGS["PATH"])
+    files_by_card = {
+        card_source: card_files(card_source) for card_source in cards_index
     }
+    card_paths_map = find_static_cards(
+        static_generator,
+        itertools.chain.from_iterable(
+            files.values() for files in files_by_card.values()
+        ),
+    )
 
-    for content_object in itertools.chain(
-        generator_content(articles_generator), generator_content(pages_generator)
-    ):
-        if should_skip_object(content_object):
-            continue
-
-        key = getattr(content_object, f"{PLUGIN_SETTINGS['KEY_NAME']}_source", None)
-        og_image_attr = card_paths_map.get(key)
-        if not key or not og_image_attr:
-            continue
+    for card_source, content_objects in cards_index.items():
+        attributes = {}
+        for key_name, source_path in files_by_card[card_source].items():
+            og_image_attr = card_paths_map.get(source_path)
+            if not og_image_attr:
+                continue
+            if PLUGIN_SETTINGS["INCLUDE_SITEURL"]:
+                siteurl = articles_generator.settings["SITEURL"]
+                og_image_attr = f"{siteurl}/{og_image_attr}"
+            attributes[key_name] = og_image_attr
 
-        if PLUGIN_SETTINGS["INCLUDE_SITEURL"]:
-            siteurl = articles_generator.settings["SITEURL"]
-            og_image_attr = f"{siteurl}/{og_image_attr}"
+        for content_object in content_objects:
+            if not attributes or should_skip_object(content_object):
+                continue
+            content_metadata = getattr(content_object, "metadata", None)
+            for key_name, og_image_attr in attributes.items():
+                setattr(content_object, key_name, og_image_attr)
+                if content_metadata is not None:
+                    content_metadata.setdefault(key_name, og_image_attr)
 
-        setattr(content_object, PLUGIN_SETTINGS["KEY_NAME"], og_image_attr)
-        content_metadata = getattr(content_object, "metadata", None)
-        if content_metadata is not None:
-            content_metadata.setdefault(PLUGIN_SETTINGS["KEY_NAME"], og_image_attr)
+    cards_index.clear()
 
 
 def register():
@@ -98,3 +451,5 @@ def register():
     signals.article_generator_finalized.connect(generate_cards)
     signals.page_generator_finalized.connect(generate_cards)
     signals.all_generators_finalized.connect(attach_metadata)
+    signals.get_generators.connect(get_generators)
+    signals.finalized.connect(wait_for_cards)
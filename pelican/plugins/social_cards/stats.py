@@ -0,0 +1,147 @@
+from collections import Counter, defaultdict
+import contextlib
+import heapq
+import json
+import logging
+from pathlib import Path
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_CARDS = 10
+
+STAGES = {
+    "exists_check": "checking existing files",
+    "wrapping": "wrapping",
+    "layout": "layout",
+    "drawing": "drawing",
+    "encoding": "encoding",
+}
+
+COUNTERS = {
+    "rendered": "rendered",
+    "deduplicated": "deduplicated",
+    "cached": "from cache",
+    "unchanged": "unchanged",
+    "skipped_existing": "skipped (existing)",
+    "skipped_by_key": "skipped (metadata)",
+    "overflow": "overflowing canvas",
+    "orphaned": "orphaned",
+}
+
+
+def get_peak_memory(who="self"):
+    """Return peak resident memory in bytes, or ``None`` if it's not known.
+
+    ``who`` is "self" for current process, or "children" for the largest of
+    finished child processes.
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(
+        resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN
+    )
+    # macOS reports bytes, other systems kilobytes
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+class BuildStats:
+    """Timings and counters of card generation."""
+
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.counters = Counter()
+        self.total_seconds = 0
+        self.peak_memory = None
+        self.workers_peak_memory = None
+        self._slowest_cards = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """Add time spent in context to given stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] += time.perf_counter() - start
+
+    def count(self, counter, value=1):
+        """Increase counter. This may be called from multiple threads."""
+        with self._lock:
+            self.counters[counter] += value
+
+    def record_card(self, card_path, seconds):
+        """Remember time it took to generate card, if it's among the slowest."""
+        entry = (seconds, str(card_path))
+        if len(self._slowest_cards) < SLOWEST_CARDS:
+            heapq.heappush(self._slowest_cards, entry)
+        else:
+            heapq.heappushpop(self._slowest_cards, entry)
+
+    def record_peak_memory(self):
+        """Remember peak memory of Pelican process and of worker processes.
+
+        Operating system only reports peak since process started, so this
+        includes memory used by Pelican before cards were generated.
+        """
+        self.peak_memory = get_peak_memory("self")
+        self.workers_peak_memory = get_peak_memory("children") or None
+
+    def merge(self, data):
+        """Add stats returned by ``as_dict`` of another instance."""
+        for stage, seconds in data["timings"].items():
+            self.timings[stage] += seconds
+        self.counters.update(data["counters"])
+        for card in data["slowest_cards"]:
+            self.record_card(card["path"], card["seconds"])
+
+    def as_dict(self):  # noqa: D102
+        return {
+            "total_seconds": self.total_seconds,
+            "peak_memory": self.peak_memory,
+            "workers_peak_memory": self.workers_peak_memory,
+            "timings": dict(self.timings),
+            "counters": dict(self.counters),
+            "slowest_cards": [
+                {"path": path, "seconds": seconds}
+                for seconds, path in sorted(self._slowest_cards, reverse=True)
+            ],
+        }
+
+    def log_summary(self, label):
+        """Log one-line summary of counters and timings."""
+        counters = ", ".join(
+            f"{self.counters[name]} {description}"
+            for name, description in COUNTERS.items()
+        )
+        timings = ", ".join(
+            f"{description} {self.timings[name]:.2f}s"
+            for name, description in STAGES.items()
+            if name in self.timings
+        )
+        memory = ""
+        if self.peak_memory:
+            memory = f", peak memory {self.peak_memory / 1024 / 1024:.0f} MB"
+        if self.workers_peak_memory:
+            memory += f" (workers {self.workers_peak_memory / 1024 / 1024:.0f} MB)"
+        logger.info(
+            f"pelican.plugins.social_cards: {label}: {counters} "
+            f"in {self.total_seconds:.2f}s ({timings}){memory}"
+        )
+
+
+def save_stats(path, stats_by_label):
+    """Write stats of all generators to JSON file."""
+    data = {label: stats.as_dict() for label, stats in stats_by_label.items()}
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2)
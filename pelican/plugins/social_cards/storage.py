@@ -0,0 +1,90 @@
+import contextlib
+import json
+import logging
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Hold exclusive lock of file, waiting until other processes release it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def replacing(target_path):
+    """Yield temporary path that atomically replaces target once it's written.
+
+    Existing target is never written into, so its hardlinks are left intact,
+    and readers never see partially written file.
+    """
+    tmp_path = target_path.with_name(f".{target_path.name}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        yield tmp_path
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    tmp_path.replace(target_path)
+
+
+def write_atomically(path, data):
+    """Replace file with given bytes."""
+    with replacing(path) as tmp_path:
+        tmp_path.write_bytes(data)
+
+
+def load_json_state(path, version, description):
+    """Return data of JSON file saved by :func:`save_json_state`.
+
+    ``None`` is returned if file doesn't exist, can't be read, or was saved
+    in different version of the format.
+    """
+    try:
+        with Path(path).open(encoding="utf-8") as fh:
+            data = json.load(fh)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(
+            f"pelican.plugins.social_cards: Ignoring unreadable {description} "
+            f"{path}: {e}"
+        )
+        return None
+
+    if not isinstance(data, dict) or data.get("version") != version:
+        logger.debug(f"Ignoring {description} {path} in unknown format")
+        return None
+    return data
+
+
+def save_json_state(path, data, indent=None):
+    """Atomically write data to JSON file, creating its directory if needed.
+
+    Data is a dictionary with ``"version"`` key, checked when file is loaded.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = json.dumps(data, indent=indent, sort_keys=True)
+    write_atomically(path, content.encode("utf-8"))
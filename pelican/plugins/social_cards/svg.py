@@ -0,0 +1,100 @@
+import base64
+from xml.sax.saxutils import escape, quoteattr
+
+SVG_EXTENSION = "svg"
+
+
+def is_svg(extension):
+    return extension.lower() == SVG_EXTENSION
+
+
+def data_uri(data, mime_type):
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def color_attributes(name, rgba):
+    """Return SVG attributes setting color given as ``(r, g, b, a)`` tuple."""
+    red, green, blue, alpha = rgba
+    attributes = f'{name}="rgb({red},{green},{blue})"'
+    if alpha < 255:  # noqa: PLR2004
+        attributes += f' {name}-opacity="{alpha / 255:.3g}"'
+    return attributes
+
+
+def font_attributes(family, style, size):
+    """Return SVG attributes selecting font by name and style reported by Pillow."""
+    attributes = [f"font-family={quoteattr(family)}", f'font-size="{size}"']
+    style = style.lower()
+    if "bold" in style:
+        attributes.append('font-weight="bold"')
+    if "italic" in style or "oblique" in style:
+        attributes.append('font-style="italic"')
+    return " ".join(attributes)
+
+
+def outline_attributes(size, rgba):
+    """Return SVG attributes drawing outline of given size around text."""
+    # stroke is centered on glyph edges, and painted below the fill
+    return (
+        f'{color_attributes("stroke", rgba)} stroke-width="{size * 2}" '
+        f'stroke-linejoin="round" paint-order="stroke"'
+    )
+
+
+def shadow_filter(offset, blur, rgba):
+    """Return SVG filter that adds drop shadow of text, with outline."""
+    dx, dy = offset
+    red, green, blue, alpha = rgba
+    return (
+        f'<filter id="shadow" x="-50%" y="-50%" width="200%" height="200%">'
+        f'<feDropShadow dx="{dx}" dy="{dy}" stdDeviation="{blur}" '
+        f'flood-color="rgb({red},{green},{blue})" '
+        f'flood-opacity="{alpha / 255:.3g}"/></filter>'
+    )
+
+
+class SvgCard:
+    """Card as SVG document: text elements over template image.
+
+    Text is placed at positions computed from Pillow font metrics, so it
+    matches bitmap cards as long as the same font is available to program
+    that displays the card.
+    """
+
+    def __init__(self, template_size, template_href, lines, text_attributes, shadow):
+        self._template_size = template_size
+        self._template_href = template_href
+        self._lines = lines
+        self._text_attributes = text_attributes
+        self._shadow = shadow
+
+    def encode(self, size=None):
+        """Return SVG document as bytes.
+
+        With ``size``, document is scaled to fill it, and cropped if aspect
+        ratio is different, like bitmap cards of output profiles.
+        """
+        width, height = self._template_size
+        output_width, output_height = size or self._template_size
+        header = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" '
+            f'xmlns:xlink="http://www.w3.org/1999/xlink" '
+            f'width="{output_width}" height="{output_height}" '
+            f'viewBox="0 0 {width} {height}" preserveAspectRatio="xMidYMid slice">'
+        )
+        parts = [header]
+        group_attributes = self._text_attributes
+        if self._shadow:
+            parts.append(f"<defs>{self._shadow}</defs>")
+            group_attributes += ' filter="url(#shadow)"'
+        parts.append(
+            f"<image xlink:href={quoteattr(self._template_href)} "
+            f'width="{width}" height="{height}"/>'
+        )
+        parts.append(f'<g xml:space="preserve" {group_attributes}>')
+        parts.extend(
+            f'<text x="{x}" y="{y}">{escape(line)}</text>'
+            for line, (x, y) in self._lines
+        )
+        parts.append("</g>\n</svg>\n")
+        return "\n".join(parts).encode("utf-8")
@@ -0,0 +1,219 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import contextlib
+import logging
+import multiprocessing
+from multiprocessing import shared_memory, util
+import os
+import threading
+
+from .cards_generator import (
+    IMAGE_BYTES_PER_PIXEL,
+    CardsGenerator,
+    Image,
+    card_memory_size,
+    shared_templates,
+    template_cache,
+)
+from .metrics import line_metrics
+from .settings import PLUGIN_SETTINGS
+from .stats import BuildStats
+
+logger = logging.getLogger(__name__)
+
+# Settings that are only used in main process, and may not be picklable
+MAIN_PROCESS_SETTINGS = ("WRAPPING_FUNCTION",)
+
+# Templates smaller than that are not worth placing in shared memory
+SHARED_TEMPLATE_MIN_BYTES = 1024 * 1024
+# Modes of templates that can be shared, and raw modes they are stored in
+SHARED_TEMPLATE_MODES = {"L": "L", "RGB": "RGBX", "RGBA": "RGBA"}
+
+_cards_generator = None
+_shared_blocks = []
+
+
+def get_workers_count():
+    workers = PLUGIN_SETTINGS.get("WORKERS", 1)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def fit_in_memory_budget(count, item_size, reserved_size=0):
+    """Return how many of ``count`` items fit in memory budget, at least one.
+
+    Budget is given in megabytes. ``reserved_size`` bytes of it are already
+    taken, e.g. by templates.
+    """
+    budget = PLUGIN_SETTINGS.get("MEMORY_BUDGET", 0) * 1024 * 1024
+    if budget <= 0 or item_size <= 0:
+        return count
+    return max(1, min(count, (budget - reserved_size) // item_size))
+
+
+def _image_size(img):
+    return img.width * img.height * IMAGE_BYTES_PER_PIXEL
+
+
+@contextlib.contextmanager
+def share_templates(templates):
+    """Place large decoded templates in shared memory for duration of context.
+
+    Yields descriptions of shared templates, to be passed to worker
+    processes. Templates are decoded once, and workers read them without
+    making their own copies.
+    """
+    blocks = []
+    descriptions = []
+    try:
+        for path, template in templates.items():
+            raw_mode = SHARED_TEMPLATE_MODES.get(template.mode)
+            # each character of raw mode is one byte of pixel
+            size = template.width * template.height * len(raw_mode or "")
+            if size < SHARED_TEMPLATE_MIN_BYTES:
+                continue
+            data = template.tobytes("raw", raw_mode)
+            block = shared_memory.SharedMemory(create=True, size=len(data))
+            blocks.append(block)
+            block.buf[: len(data)] = data
+            del data
+            descriptions.append((path, block.name, raw_mode, template.size))
+        yield descriptions
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _attach_shared_templates(descriptions):
+    for path, name, mode, size in descriptions:
+        block = shared_memory.SharedMemory(name=name)
+        _shared_blocks.append(block)
+        shared_templates[path] = Image.frombuffer(
+            mode, size, block.buf, "raw", mode, 0, 1
+        )
+
+    # templates inherited from main process are loaded from shared memory
+    CardsGenerator._template = None
+    template_cache.clear()
+    util.Finalize(None, _detach_shared_templates, exitpriority=10)
+
+
+def _detach_shared_templates():
+    global _cards_generator  # noqa: PLW0603
+    _cards_generator = None
+    CardsGenerator._template = None
+    template_cache.clear()
+    shared_templates.clear()
+    for block in _shared_blocks:
+        with contextlib.suppress(BufferError):
+            block.close()
+    _shared_blocks.clear()
+
+
+def _initialize_worker(settings, templates):
+    global _cards_generator  # noqa: PLW0603
+    PLUGIN_SETTINGS.clear()
+    PLUGIN_SETTINGS.update(settings)
+    if templates:
+        _attach_shared_templates(templates)
+    if PLUGIN_SETTINGS.get("METRICS_CACHE"):
+        line_metrics.load(PLUGIN_SETTINGS["METRICS_CACHE"])
+    _cards_generator = CardsGenerator()
+
+
+def _render_card(card):
+    _cards_generator.stats = BuildStats()
+    target_path = _cards_generator.render_card(card)
+    return target_path, _cards_generator.stats.as_dict()
+
+
+def _pool_context():
+    """Return multiprocessing context to start worker processes with.
+
+    Forked process only has a copy of the thread that forked it, so when
+    cards are rendered in background, while Pelican keeps running in main
+    thread, workers are started by fork server, or spawned, instead.
+    """
+    if threading.current_thread() is threading.main_thread():
+        return None
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def render_in_pool(cards_generator, cards, workers):
+    """Render cards in pool of worker processes.
+
+    Each worker loads font once, and large templates are shared with
+    workers instead of being decoded by each of them. Number of workers
+    is limited, so that images they hold fit in memory budget. Yields
+    cards in order, as they are saved to disk. Stats of workers are
+    merged into stats of ``cards_generator``.
+    """
+    settings = {
+        key: value
+        for key, value in PLUGIN_SETTINGS.items()
+        if key not in MAIN_PROCESS_SETTINGS
+    }
+    templates = cards_generator.get_templates(cards)
+
+    with share_templates(templates) as shared:
+        shared_paths = {path for path, *_ in shared}
+        templates_size = sum(map(_image_size, templates.values()))
+        worker_size = max(
+            card_memory_size(template)
+            + (0 if path in shared_paths else _image_size(template))
+            for path, template in templates.items()
+        )
+        workers = fit_in_memory_budget(workers, worker_size, templates_size)
+        chunksize = max(1, len(cards) // (workers * 4))
+
+        logger.debug(f"Rendering {len(cards)} cards using {workers} worker processes")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=_pool_context(),
+            initializer=_initialize_worker,
+            initargs=(settings, shared),
+        ) as executor:
+            results = executor.map(_render_card, cards, chunksize=chunksize)
+            for card, (_, worker_stats) in zip(cards, results):
+                cards_generator.stats.merge(worker_stats)
+                yield card
+
+
+def render_pipelined(cards_generator, cards, threads):
+    """Draw cards in current thread, and save them in pool of threads.
+
+    Card is drawn while previous cards are still being encoded and
+    written. Number of cards waiting to be saved is limited by number of
+    threads and by memory budget, and each of them has own reusable
+    image. Yields cards in order, as they are saved to disk.
+    """
+    templates = cards_generator.get_templates(cards).values()
+    slots = fit_in_memory_budget(
+        threads * 2,
+        max(map(card_memory_size, templates)),
+        sum(map(_image_size, templates)),
+    )
+    pending = deque()
+
+    logger.debug(f"Rendering {len(cards)} cards using {threads} encoder threads")
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for index, card in enumerate(cards):
+            if len(pending) >= slots:
+                yield _finish_saving(cards_generator, *pending.popleft())
+
+            img, draw_seconds = cards_generator.draw_card(card, slot=index % slots)
+            future = executor.submit(cards_generator.save_card, img, card)
+            pending.append((card, draw_seconds, future))
+
+        while pending:
+            yield _finish_saving(cards_generator, *pending.popleft())
+
+
+def _finish_saving(cards_generator, card, draw_seconds, future):
+    encode_seconds = future.result()
+    cards_generator.record_rendered(card, draw_seconds, encode_seconds)
+    return card
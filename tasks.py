@@ -33,6 +33,18 @@ def tests(c, deprecations=False):
     c.run(f"{CMD_PREFIX}pytest {deprecations_flag}", pty=PTY)
 
 
+@task(iterable=["setting"])
+def benchmark(c, sizes="100,1000,10000", setting=None, json=False):
+    """Measure card generation speed, optionally with `--setting KEY=VALUE`."""
+    settings_flags = "".join(f" --set {value}" for value in (setting or []))
+    json_flag = " --json" if json else ""
+    c.run(
+        f"{CMD_PREFIX}python tests/benchmark.py --sizes {sizes}"
+        f"{settings_flags}{json_flag}",
+        pty=PTY,
+    )
+
+
 @task
 def format(c, check=False, diff=False):
     """Run Ruff's auto-formatter, optionally with `--check` or `--diff`."""
@@ -0,0 +1,269 @@
+"""Measure card generation speed on synthetic Pelican sites.
+
+Each site size is measured in separate process, so peak memory usage of
+one run doesn't affect the other. Run ``python tests/benchmark.py --help``
+for available options.
+"""
+
+import argparse
+import ast
+import contextlib
+import json
+from pathlib import Path
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from PIL import Image
+
+from pelican.generators import ArticlesGenerator, PagesGenerator, StaticGenerator
+from pelican.plugins.social_cards.settings import (
+    PLUGIN_SETTINGS,
+    populate_plugin_settings,
+)
+from pelican.plugins.social_cards.social_cards import (
+    attach_metadata,
+    generate_cards,
+    wait_for_cards,
+)
+
+FONT_PATH = Path(__file__).parent / "fonts" / "LiberationMono-Regular.ttf"
+DEFAULT_SIZES = (100, 1000, 10000)
+# Unrelated static files (like photos in galleries) per article
+STATIC_FILES_PER_ARTICLE = 5
+WORDS = (
+    "pelican",
+    "python",
+    "static",
+    "site",
+    "generator",
+    "social",
+    "media",
+    "card",
+    "image",
+    "title",
+    "performance",
+    "benchmark",
+    "synthetic",
+    "article",
+    "series",
+    "translation",
+    "template",
+    "font",
+    "canvas",
+    "outline",
+    "wrapping",
+    "alignment",
+)
+
+
+class FakePelican:
+    """Mock Pelican object, as passed to `initialized` signal."""
+
+    def __init__(self, settings):
+        self.settings = settings
+
+
+class FakeContent:
+    """Mock Pelican Article object."""
+
+    def __init__(self, title, save_as, series=None):
+        self.title = title
+        self.save_as = save_as
+        self.source_path = f"content/{save_as.replace('.html', '.md')}"
+        self.metadata = {"title": title}
+        self.settings = {}
+        if series:
+            self.series = {"name": series}
+
+
+class FakeStaticFile:
+    """Mock Pelican Static object."""
+
+    def __init__(self, source_path, save_as):
+        self.source_path = source_path
+        self.save_as = save_as
+
+
+def make_generator(generator_class, **attributes):
+    generator = generator_class.__new__(generator_class)
+    generator.settings = {"SITEURL": "https://www.fakesite.invalid"}
+    for name, value in attributes.items():
+        setattr(generator, name, value)
+    return generator
+
+
+def make_title(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 16))).title()
+
+
+def make_content(size, seed=0):
+    """Create `size` articles, some of them in series, some translated."""
+    rng = random.Random(seed)
+    articles, translations = [], []
+
+    for i in range(size):
+        title = make_title(rng)
+        series = f"Series {i % 7}" if i % 5 == 0 else None
+        articles.append(FakeContent(title, f"{2000 + i % 25}/article-{i}.html", series))
+        if i % 3 == 0:
+            translated_title = title if i % 2 == 0 else make_title(rng)
+            translations.append(
+                FakeContent(translated_title, f"pl/article-{i}.html", series)
+            )
+
+    return articles, translations
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    scale = 1024 if sys.platform == "darwin" else 1
+    rss = 0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        rss = max(rss, resource.getrusage(who).ru_maxrss // scale)
+    return rss
+
+
+def make_static_generator(content_path, size):
+    static_files = [
+        FakeStaticFile((content_path / f"photos/{i}.jpg").as_posix(), f"photos/{i}.jpg")
+        for i in range(size * STATIC_FILES_PER_ARTICLE)
+    ]
+    static_files.extend(
+        FakeStaticFile(path.as_posix(), f"social-cards/{path.name}")
+        for path in PLUGIN_SETTINGS["PATH"].iterdir()
+    )
+    static_content = {
+        Path(static_file.source_path).relative_to(content_path).as_posix(): static_file
+        for static_file in static_files
+    }
+    generator = make_generator(
+        StaticGenerator,
+        staticfiles=static_files,
+        context={"static_content": static_content},
+    )
+    generator.settings["PATH"] = str(content_path)
+    return generator
+
+
+def build(articles_generator, pages_generator, content_path, size):
+    start = time.perf_counter()
+    generate_cards(articles_generator)
+    generate_cards(pages_generator)
+
+    static_generator = make_static_generator(content_path, size)
+    attach_metadata([articles_generator, pages_generator, static_generator])
+    # with SOCIAL_CARDS_BACKGROUND, cards may still be rendered
+    wait_for_cards()
+    return time.perf_counter() - start
+
+
+def run_single(size, extra_settings):
+    """Measure cold and warm build of site with `size` articles."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        content_path = Path(tmp_dir) / "content"
+        content_path.mkdir()
+        template_path = Path(tmp_dir) / "template.png"
+        Image.new("RGB", (1200, 630), "#f5f1e8").save(template_path)
+
+        settings = {
+            "PATH": str(content_path),
+            "SOCIAL_CARDS_TEMPLATE": str(template_path),
+            "SOCIAL_CARDS_FONT_FILENAME": str(FONT_PATH),
+            "SOCIAL_CARDS_INCLUDE_SERIES": True,
+        }
+        settings.update(extra_settings)
+        populate_plugin_settings(FakePelican(settings))
+
+        articles, translations = make_content(size)
+        articles_generator = make_generator(
+            ArticlesGenerator, articles=articles, translations=translations
+        )
+        pages_generator = make_generator(PagesGenerator, pages=[])
+        cards = len(articles) + len(translations)
+
+        cold = build(articles_generator, pages_generator, content_path, size)
+        warm = build(articles_generator, pages_generator, content_path, size)
+
+    return {
+        "articles": size,
+        "cards": cards,
+        "cold_seconds": round(cold, 3),
+        "warm_seconds": round(warm, 3),
+        "cards_per_second": round(cards / cold, 1),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def print_table(results):
+    header = ("articles", "cards", "cold [s]", "warm [s]", "cards/s", "peak RSS [MB]")
+    print("".join(f"{column:>15}" for column in header))  # noqa: T201
+    for result in results:
+        rss = result["peak_rss_kb"]
+        row = (
+            result["articles"],
+            result["cards"],
+            result["cold_seconds"],
+            result["warm_seconds"],
+            result["cards_per_second"],
+            round(rss / 1024, 1) if rss is not None else "n/a",
+        )
+        print("".join(f"{value:>15}" for value in row))  # noqa: T201
+
+
+def parse_setting(value):
+    key, _, raw_value = value.partition("=")
+    with contextlib.suppress(ValueError, SyntaxError):
+        raw_value = ast.literal_eval(raw_value)
+    return key, raw_value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="comma-separated numbers of articles in synthetic sites",
+    )
+    parser.add_argument(
+        "--set",
+        dest="settings",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Pelican setting to use, e.g. SOCIAL_CARDS_WORKERS=4",
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    extra_settings = dict(parse_setting(setting) for setting in args.settings)
+
+    if args.single:
+        print(json.dumps(run_single(args.single, extra_settings)))  # noqa: T201
+        return
+
+    results = []
+    for size in args.sizes.split(","):
+        command = [sys.executable, __file__, "--single", size.strip()]
+        for setting in args.settings:
+            command.extend(("--set", setting))
+        output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True)
+        results.append(json.loads(output.stdout.splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))  # noqa: T201
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ from PIL import Image
 import pytest
 
 from pelican.plugins.social_cards.cards_generator import CardsGenerator
-from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS
+from pelican.plugins.social_cards.settings import DEFAULT_SETTINGS, PLUGIN_SETTINGS
 
 
 class FakeArticle:
@@ -24,6 +24,22 @@ class FakeArticle:
             setattr(self, key, value)
 
 
+class FakeGenerator:
+    """Mock Pelican ArticlesGenerator object."""
+
+    def __init__(self, articles):
+        self.articles = articles
+
+
+def make_article(title, save_as):
+    """Create a fake article that can have card generated."""
+    article = FakeArticle(
+        settings={}, metadata={"title": title}, title=title, url=save_as
+    )
+    article.set_custom_data({"save_as": save_as, "source_path": f"{save_as}.md"})
+    return article
+
+
 @pytest.fixture()
 def article():
     """Create a fake article."""
@@ -51,11 +67,17 @@ def default_settings():
 
     PLUGIN_SETTINGS.update(
         **{
+            "FORMAT_EXTENSION": "png",
+            "PROFILES": {},
             "FONT_FILENAME": "tests/fonts/LiberationMono-Regular.ttf",
             "FONT_SIZE": 20,
             "FONT_FILL": "#000000",
             "FONT_OUTLINE_SIZE": 0,
             "FONT_OUTLINE_FILL": "#000000",
+            "FONT_OUTLINE_METHOD": "stroke",
+            "SHADOW_OFFSET": None,
+            "SHADOW_BLUR": 0,
+            "SHADOW_FILL": "#00000080",
             "CANVAS_WIDTH": 300,
             "CANVAS_HEIGHT": 300,
             "CANVAS_LEFT": 0,
@@ -72,6 +94,23 @@ def default_settings():
 
 @pytest.fixture()
 def cards_generator():
+    CardsGenerator.unload_files()
     CardsGenerator._template = Image.new("RGB", (300, 300), "#ffffff")
     cd = CardsGenerator()
     return cd
+
+
+@pytest.fixture()
+def generation_settings(tmp_path, default_settings, cards_generator):
+    """Set up settings for tests that write cards to disk."""
+    template_path = tmp_path / "template.png"
+    CardsGenerator._template.save(template_path)
+
+    for key, value in DEFAULT_SETTINGS.items():
+        PLUGIN_SETTINGS.setdefault(key, value)
+    PLUGIN_SETTINGS.update(
+        TEMPLATE=template_path,
+        PATH=tmp_path / "social-cards",
+        configured=True,
+    )
+    PLUGIN_SETTINGS["PATH"].mkdir()
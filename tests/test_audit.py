@@ -0,0 +1,59 @@
+import json
+from types import SimpleNamespace
+
+from conftest import FakeGenerator, make_article
+import pytest
+
+from pelican.plugins.social_cards.cards_generator import CardsGenerator
+from pelican.plugins.social_cards.settings import (
+    PLUGIN_SETTINGS,
+    populate_plugin_settings,
+)
+from pelican.plugins.social_cards.social_cards import generate_cards, generators_audits
+
+
+def test_audit_reports_overflow_without_generating_cards(tmp_path, generation_settings):
+    """With audit enabled, texts are measured but no card is drawn or saved."""
+    PLUGIN_SETTINGS["AUDIT"] = str(tmp_path / "audit.json")
+    CardsGenerator.unload_files(font=False)
+    generator = FakeGenerator(
+        [
+            make_article("Fits", "fits.html"),
+            make_article("Overflowing " * 5, "overflowing.html"),
+        ]
+    )
+
+    generate_cards(generator)
+
+    audit = generators_audits["FakeGenerator"]
+    assert audit.checked == len(generator.articles)
+    assert [entry["source_path"] for entry in audit.overflowing] == [
+        "overflowing.html.md"
+    ]
+    assert audit.overflowing[0]["width"] > PLUGIN_SETTINGS["CANVAS_WIDTH"]
+    report = json.loads((tmp_path / "audit.json").read_text())
+    assert report["FakeGenerator"]["overflowing"] == audit.overflowing
+    assert not any(PLUGIN_SETTINGS["PATH"].iterdir())
+    assert CardsGenerator._template is None
+
+
+@pytest.mark.parametrize(
+    ("audit", "expected"), [(True, True), ("reports/audit.json", "reports/audit.json")]
+)
+def test_audit_path_relative_to_content_path(
+    tmp_path, default_settings, audit, expected
+):
+    pelican_instance = SimpleNamespace(
+        settings={
+            "PATH": str(tmp_path),
+            "SOCIAL_CARDS_TEMPLATE": "template.png",
+            "SOCIAL_CARDS_AUDIT": audit,
+        }
+    )
+
+    populate_plugin_settings(pelican_instance)
+
+    if expected is True:
+        assert PLUGIN_SETTINGS["AUDIT"] is True
+    else:
+        assert PLUGIN_SETTINGS["AUDIT"] == tmp_path / expected
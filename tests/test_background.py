@@ -0,0 +1,165 @@
+import json
+from pathlib import Path
+import threading
+import time
+
+from PIL import Image
+import pytest
+
+from pelican import Pelican, signals
+from pelican.plugins.social_cards import social_cards
+from pelican.plugins.social_cards.cards_generator import CardsGenerator
+from pelican.settings import read_settings
+
+FONT_PATH = Path(__file__).parent / "fonts" / "LiberationMono-Regular.ttf"
+
+
+@pytest.fixture()
+def site(tmp_path):
+    """Create Pelican site with two articles, in temporary directory."""
+    content_path = tmp_path / "content"
+    content_path.mkdir()
+    for slug in ("first", "second"):
+        (content_path / f"{slug}.md").write_text(
+            f"Title: {slug.title()} article\nDate: 2020-01-01\n\nText\n"
+        )
+    Image.new("RGB", (300, 300), "#ffffff").save(tmp_path / "template.png")
+    CardsGenerator.unload_files()
+    yield tmp_path
+    CardsGenerator.unload_files()
+
+
+def build(site, **settings):
+    settings = read_settings(
+        override={
+            "PATH": str(site / "content"),
+            "OUTPUT_PATH": str(site / "output"),
+            "PLUGINS": ["pelican.plugins.social_cards"],
+            "STATIC_PATHS": ["social-cards"],
+            "CACHE_CONTENT": False,
+            "SOCIAL_CARDS_TEMPLATE": str(site / "template.png"),
+            "SOCIAL_CARDS_FONT_FILENAME": str(FONT_PATH),
+            "SOCIAL_CARDS_FONT_SIZE": 20,
+            "SOCIAL_CARDS_CANVAS_WIDTH": 300,
+            "SOCIAL_CARDS_CANVAS_HEIGHT": 300,
+            **settings,
+        }
+    )
+    Pelican(settings).run()
+
+
+def test_cards_rendered_in_background_are_copied(site, monkeypatch):
+    """Cards still rendered when Pelican looks for static files are copied."""
+    render_cards = social_cards.render_cards
+
+    def slow_render_cards(*args):
+        time.sleep(0.2)
+        render_cards(*args)
+
+    monkeypatch.setattr(social_cards, "render_cards", slow_render_cards)
+    og_images = {}
+
+    def record_og_image(generator, content):
+        og_images[content.slug] = getattr(content, "og_image", None)
+
+    signals.article_generator_write_article.connect(record_og_image)
+    try:
+        build(site, SOCIAL_CARDS_BACKGROUND=True)
+    finally:
+        signals.article_generator_write_article.disconnect(record_og_image)
+
+    assert og_images == {
+        "first-article": "social-cards/first-article.png",
+        "second-article": "social-cards/second-article.png",
+    }
+    for card_name in ("first-article.png", "second-article.png"):
+        card_path = site / "content" / "social-cards" / card_name
+        output_path = site / "output" / "social-cards" / card_name
+        assert output_path.read_bytes() == card_path.read_bytes()
+    assert not social_cards.background_jobs
+    assert social_cards.generators_stats["articles"].counters["rendered"] == len(
+        og_images
+    )
+
+
+def test_background_jobs_save_shared_state(site, monkeypatch):
+    """State shared by background jobs is saved after all of them are rendered."""
+    content_path = site / "content"
+    (content_path / "pages").mkdir()
+    (content_path / "pages" / "about.md").write_text("Title: About\n\nText\n")
+    events = []
+    render_cards, finish_job = social_cards.render_cards, social_cards.finish_job
+
+    def slow_render_cards(*args):
+        time.sleep(0.1)
+        render_cards(*args)
+        events.append("rendered")
+
+    def recorded_finish_job(*args):
+        events.append("finished")
+        finish_job(*args)
+
+    monkeypatch.setattr(social_cards, "render_cards", slow_render_cards)
+    monkeypatch.setattr(social_cards, "finish_job", recorded_finish_job)
+
+    build(
+        site,
+        SOCIAL_CARDS_BACKGROUND=True,
+        SOCIAL_CARDS_MANIFEST="social-cards.json",
+        SOCIAL_CARDS_METRICS_CACHE="metrics.json",
+        SOCIAL_CARDS_CACHE_DIR=str(site / "cache"),
+    )
+
+    assert events == ["rendered", "rendered", "finished", "finished"]
+    manifest = json.loads((content_path / "social-cards.json").read_text())
+    assert sorted(manifest["cards"]) == [
+        "first-article.png",
+        "pages-about.png",
+        "second-article.png",
+    ]
+    assert json.loads((content_path / "metrics.json").read_text())["entries"]
+    cache_index = json.loads((site / "cache" / "index.json").read_text())
+    assert len(cache_index["cards"]) == len(manifest["cards"])
+    assert not social_cards.background_jobs
+
+
+def test_page_cards_prepared_while_article_cards_rendered(site, monkeypatch):
+    """Main thread doesn't wait for cards rendered in background."""
+    (site / "content" / "pages").mkdir()
+    (site / "content" / "pages" / "about.md").write_text("Title: About\n\nText\n")
+    events = []
+    page_prepared = threading.Event()
+    render_cards = social_cards.render_cards
+    prepare_card = CardsGenerator.prepare_card
+
+    def blocked_render_cards(*args):
+        # articles are rendered only once page card was prepared
+        page_prepared.wait(timeout=5)
+        render_cards(*args)
+        events.append("rendered")
+
+    def recorded_prepare_card(self, content_object):
+        events.append("prepared")
+        card = prepare_card(self, content_object)
+        if content_object.slug == "about":
+            page_prepared.set()
+        return card
+
+    monkeypatch.setattr(social_cards, "render_cards", blocked_render_cards)
+    monkeypatch.setattr(CardsGenerator, "prepare_card", recorded_prepare_card)
+
+    build(site, SOCIAL_CARDS_BACKGROUND=True)
+
+    assert page_prepared.is_set()
+    assert events == ["prepared", "prepared", "prepared", "rendered", "rendered"]
+    assert (site / "output" / "social-cards" / "pages-about.png").exists()
+
+
+def test_worker_processes_in_background(site):
+    build(site, SOCIAL_CARDS_BACKGROUND=True, SOCIAL_CARDS_WORKERS=2)
+
+    card_names = ("first-article.png", "second-article.png")
+    for card_name in card_names:
+        assert (site / "output" / "social-cards" / card_name).exists()
+    counters = social_cards.generators_stats["articles"].counters
+    assert counters["rendered"] == len(card_names)
@@ -0,0 +1,111 @@
+import shutil
+
+from conftest import FakeGenerator, make_article
+import pytest
+
+from pelican.plugins.social_cards.cache import CardsCache
+from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS
+from pelican.plugins.social_cards.social_cards import generate_cards, generators_stats
+
+
+@pytest.fixture()
+def cache_settings(tmp_path, generation_settings):
+    PLUGIN_SETTINGS.update(
+        CACHE_DIR=tmp_path / "cache",
+        PROFILES={"og_image_small": {"SIZE": (100, 50), "FORMAT_EXTENSION": "png"}},
+    )
+
+
+def fresh_checkout():
+    shutil.rmtree(PLUGIN_SETTINGS["PATH"])
+    PLUGIN_SETTINGS["PATH"].mkdir()
+
+
+def test_cards_are_restored_from_cache(cache_settings):
+    """Cards removed from content directory are taken from cache."""
+    generator = FakeGenerator([make_article("Cached card", "cached.html")])
+    card_path = PLUGIN_SETTINGS["PATH"] / "cached.png"
+    profile_path = PLUGIN_SETTINGS["PATH"] / "cached-og_image_small.png"
+    generate_cards(generator)
+    expected = card_path.read_bytes(), profile_path.read_bytes()
+    fresh_checkout()
+
+    generate_cards(generator)
+
+    assert (card_path.read_bytes(), profile_path.read_bytes()) == expected
+    counters = generators_stats["FakeGenerator"].counters
+    assert counters["cached"] == 1
+    assert counters["rendered"] == 0
+
+
+def test_changed_card_is_not_restored(cache_settings):
+    """Card with different title is rendered, and cached too."""
+    generator = FakeGenerator([make_article("Cached card", "cached.html")])
+    generate_cards(generator)
+    fresh_checkout()
+
+    generator.articles[0].metadata["title"] = "Another title"
+    generate_cards(generator)
+    fresh_checkout()
+    generate_cards(generator)
+
+    counters = generators_stats["FakeGenerator"].counters
+    assert counters["cached"] == 1
+    cached_titles = CardsCache(PLUGIN_SETTINGS["CACHE_DIR"])._entries
+    assert len(cached_titles) == len(["Cached card", "Another title"])
+
+
+def test_card_missing_from_cache_is_rendered(cache_settings):
+    """Cards whose files were removed from cache are rendered again."""
+    generator = FakeGenerator([make_article("Cached card", "cached.html")])
+    generate_cards(generator)
+    for path in PLUGIN_SETTINGS["CACHE_DIR"].rglob("*.png"):
+        path.unlink()
+    fresh_checkout()
+
+    generate_cards(generator)
+
+    counters = generators_stats["FakeGenerator"].counters
+    assert counters["rendered"] == 1
+    assert (PLUGIN_SETTINGS["PATH"] / "cached.png").exists()
+
+
+def test_least_recently_used_cards_are_evicted(tmp_path, default_settings):
+    """Cache is trimmed to size limit, starting with least recently used."""
+    PLUGIN_SETTINGS.update(PROFILES={})
+    cache = CardsCache(tmp_path / "cache", size_limit=250)
+    for name, last_used in (("aa01", 3), ("bb02", 1), ("cc03", 2)):
+        card_path = tmp_path / f"{name}.png"
+        card_path.write_bytes(b"x" * 100)
+        cache.store(name, card_path)
+        cache._entries[name]["used"] = last_used
+    cache.save()
+
+    cache = CardsCache(tmp_path / "cache", size_limit=250)
+    assert set(cache._entries) == {"aa01", "cc03"}
+    assert not (tmp_path / "cache" / "bb" / "bb02.png").exists()
+
+
+def test_builds_sharing_cache_keep_each_other_cards(tmp_path, default_settings):
+    """Index saved by one build is merged with index saved by the other one."""
+    PLUGIN_SETTINGS.update(PROFILES={})
+    first_cache = CardsCache(tmp_path / "cache", size_limit=250)
+    second_cache = CardsCache(tmp_path / "cache", size_limit=250)
+    for cache, name in ((first_cache, "aa01"), (second_cache, "bb02")):
+        card_path = tmp_path / f"{name}.png"
+        card_path.write_bytes(b"x" * 100)
+        cache.store(name, card_path)
+    first_cache.save()
+    second_cache.save()
+
+    cache = CardsCache(tmp_path / "cache", size_limit=250)
+    assert set(cache._entries) == {"aa01", "bb02"}
+
+    card_path = tmp_path / "cc03.png"
+    card_path.write_bytes(b"x" * 100)
+    first_cache.store("cc03", card_path)
+    first_cache.save()
+
+    cache = CardsCache(tmp_path / "cache", size_limit=250)
+    assert set(cache._entries) == {"bb02", "cc03"}
+    assert not (tmp_path / "cache" / "aa" / "aa01.png").exists()
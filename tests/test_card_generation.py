@@ -1,7 +1,16 @@
-from PIL import Image
+import os
+from types import SimpleNamespace
+
+from conftest import FakeGenerator, make_article
+from PIL import Image, ImageChops, features
 import pytest
 
-from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS
+from pelican.plugins.social_cards.cards_generator import CardsGenerator
+from pelican.plugins.social_cards.settings import (
+    PLUGIN_SETTINGS,
+    populate_plugin_settings,
+)
+from pelican.plugins.social_cards.social_cards import generate_cards, generators_stats
 
 
 def assert_image_equal_tofile(a, filename):
@@ -58,3 +67,296 @@ def test_text_outline_color_no_size(default_settings, cards_generator):
     img = cards_generator._generate_card_image(text)
 
     assert_image_equal_tofile(img, reference_file)
+
+
+def test_mask_outline_matches_stroke(default_settings, cards_generator):
+    """Outline grown from text mask looks like stroked text."""
+    text = ["Text outline test", "text with outline"]
+    PLUGIN_SETTINGS["FONT_OUTLINE_SIZE"] = 6
+    PLUGIN_SETTINGS["FONT_OUTLINE_FILL"] = "#28c911"
+    stroked = cards_generator._generate_card_image(text)
+
+    PLUGIN_SETTINGS["FONT_OUTLINE_METHOD"] = "mask"
+    masked = cards_generator._generate_card_image(text)
+
+    difference = ImageChops.difference(stroked, masked).convert("L")
+    differing_pixels = difference.point([0] * 128 + [1] * 128).histogram()[1]
+    assert differing_pixels < stroked.width * stroked.height * 0.01
+
+
+def test_text_shadow(default_settings, cards_generator):
+    """Shadow is drawn below text, moved by offset."""
+    text = ["Shadow"]
+    plain = cards_generator._generate_card_image(text)
+    PLUGIN_SETTINGS.update(SHADOW_OFFSET=(5, 5), SHADOW_FILL="#ff0000")
+
+    img = cards_generator._generate_card_image(text)
+
+    background = Image.new("RGB", img.size, "#ffffff")
+    plain_box = ImageChops.difference(plain, background).getbbox()
+    shadow_box = ImageChops.difference(img, background).getbbox()
+    assert shadow_box[:2] == plain_box[:2]
+    assert shadow_box[2] >= plain_box[2] + 4
+    assert shadow_box[3] >= plain_box[3] + 4
+    assert (255, 0, 0) in {color for _, color in img.getcolors(img.width * img.height)}
+
+
+@pytest.mark.parametrize(
+    "effects",
+    ({}, {"FONT_OUTLINE_METHOD": "mask", "SHADOW_OFFSET": (4, 6), "SHADOW_BLUR": 3}),
+)
+def test_image_reused_between_cards(default_settings, cards_generator, effects):
+    """Drawing on reused image gives the same result as drawing on fresh copy."""
+    PLUGIN_SETTINGS.update(effects)
+    PLUGIN_SETTINGS["FONT_OUTLINE_SIZE"] = 3
+    PLUGIN_SETTINGS["HORIZONTAL_ALIGNMENT"] = "center"
+    PLUGIN_SETTINGS["VERTICAL_ALIGNMENT"] = "bottom"
+    texts = [
+        ["A very long line of text that does not fit on canvas"],
+        ["Short", "text"],
+        ["Text", "with", "many", "short", "lines", "that", "overflows", "canvas"],
+        [],
+        ["Final text"],
+    ]
+
+    for text in texts:
+        img = cards_generator._generate_card_image_in_place(text)
+
+        assert img.tobytes() == cards_generator._generate_card_image(text).tobytes()
+
+
+def test_save_options_are_passed_to_encoder(generation_settings):
+    """Encoder options can be set for each output format."""
+    generator = FakeGenerator([make_article("Save options test", "options.html")])
+    card_path = PLUGIN_SETTINGS["PATH"] / "options.jpg"
+    PLUGIN_SETTINGS.update(FORMAT_EXTENSION="jpg", FORCE_SAVE=True)
+
+    PLUGIN_SETTINGS["SAVE_OPTIONS"] = {"jpg": {"quality": 95}}
+    generate_cards(generator)
+    high_quality_size = card_path.stat().st_size
+
+    PLUGIN_SETTINGS["SAVE_OPTIONS"] = {"jpg": {"quality": 10}}
+    generate_cards(generator)
+
+    assert card_path.stat().st_size < high_quality_size
+
+
+def test_quantized_card_uses_palette(generation_settings):
+    """Card colors can be reduced to a palette."""
+    generator = FakeGenerator([make_article("Palette test", "palette.html")])
+    colors = 16
+    PLUGIN_SETTINGS.update(QUANTIZE_COLORS=colors)
+
+    generate_cards(generator)
+
+    with Image.open(PLUGIN_SETTINGS["PATH"] / "palette.png") as img:
+        assert img.mode == "P"
+        assert len(img.getcolors()) <= colors
+
+
+def test_quantize_skipped_for_jpeg(generation_settings):
+    """JPEG can't store palette, so JPEG cards are saved in full color."""
+    generator = FakeGenerator([make_article("Palette test", "palette.html")])
+    PLUGIN_SETTINGS.update(
+        QUANTIZE_COLORS=16,
+        PROFILES={"og_image_png": {"SIZE": (150, 150), "FORMAT_EXTENSION": "png"}},
+    )
+    PLUGIN_SETTINGS["FORMAT_EXTENSION"] = "jpg"
+
+    generate_cards(generator)
+
+    with Image.open(PLUGIN_SETTINGS["PATH"] / "palette.jpg") as img:
+        assert img.mode == "RGB"
+    with Image.open(PLUGIN_SETTINGS["PATH"] / "palette-og_image_png.png") as img:
+        assert img.mode == "P"
+
+
+def test_unsupported_format_extension(tmp_path, default_settings, caplog):
+    """Format that Pillow can't save is reported when plugin is configured."""
+    pelican_instance = SimpleNamespace(
+        settings={
+            "PATH": str(tmp_path),
+            "SOCIAL_CARDS_TEMPLATE": "template.png",
+            "SOCIAL_CARDS_FORMAT_EXTENSION": "xyz",
+        }
+    )
+
+    populate_plugin_settings(pelican_instance)
+
+    assert "Pillow can't save images in .xyz format" in caplog.text
+    assert PLUGIN_SETTINGS["FORMAT_EXTENSION"] == "png"
+
+
+@pytest.mark.skipif(not features.check("webp"), reason="Pillow without WebP")
+def test_webp_output(generation_settings):
+    """Cards can be saved in WebP format."""
+    generator = FakeGenerator([make_article("WebP test", "webp.html")])
+    PLUGIN_SETTINGS.update(FORMAT_EXTENSION="webp")
+
+    generate_cards(generator)
+
+    with Image.open(PLUGIN_SETTINGS["PATH"] / "webp.webp") as img:
+        assert img.format == "WEBP"
+
+
+@pytest.fixture()
+def variant_settings(tmp_path, generation_settings):
+    variants = {}
+    for name, color in (("red", "#ff0000"), ("blue", "#0000ff")):
+        template_path = tmp_path / f"{name}.png"
+        Image.new("RGB", (300, 300), color).save(template_path)
+        variants[name] = {"TEMPLATE": template_path}
+    variants["blue"]["FONT_FILENAME"] = PLUGIN_SETTINGS["FONT_FILENAME"]
+    PLUGIN_SETTINGS.update(
+        VARIANTS=variants,
+        CATEGORY_VARIANTS={"Reds": "red"},
+        TAG_VARIANTS={"blues": "blue"},
+        TEMPLATE_CACHE_SIZE=1,
+    )
+
+
+@pytest.mark.parametrize(
+    "custom_data,expected_color",
+    [
+        ({}, (255, 255, 255)),
+        ({"og_image_template": "blue", "category": "Reds"}, (0, 0, 255)),
+        ({"category": "Reds", "tags": ["blues"]}, (255, 0, 0)),
+        ({"category": "Greens", "tags": ["greens", "blues"]}, (0, 0, 255)),
+        ({"og_image_template": "unknown"}, (255, 255, 255)),
+    ],
+    ids=["default", "metadata", "category", "tag", "unknown"],
+)
+def test_template_variants(variant_settings, custom_data, expected_color):
+    """Template can be chosen by metadata, category or tag."""
+    article = make_article("Variant test", "variant.html")
+    article.set_custom_data(custom_data)
+
+    generate_cards(FakeGenerator([article]))
+
+    with Image.open(PLUGIN_SETTINGS["PATH"] / "variant.png") as img:
+        assert img.getpixel((299, 299)) == expected_color
+
+
+def test_template_variants_mixed(variant_settings):
+    """Cards with different templates are drawn the same as one by one."""
+    articles = []
+    for i, variant in enumerate(("red", None, "blue", "red", None, "blue")):
+        article = make_article(f"Mixed variants {i}", f"mixed-{i}.html")
+        article.set_custom_data({"og_image_template": variant})
+        articles.append(article)
+
+    generate_cards(FakeGenerator(articles))
+
+    for i, article in enumerate(articles):
+        expected = cards_generator_image(article)
+        with Image.open(PLUGIN_SETTINGS["PATH"] / f"mixed-{i}.png") as img:
+            assert img.tobytes() == expected.tobytes()
+
+
+def cards_generator_image(article):
+    cards_generator = CardsGenerator()
+    variant = cards_generator._get_variant(article)
+    text = cards_generator._get_article_title(article)
+    return cards_generator._generate_card_image(text, variant=variant)
+
+
+def test_template_converted_for_output_format(tmp_path, generation_settings):
+    """Template with alpha channel can be used to create JPEG cards."""
+    template_path = tmp_path / "rgba.png"
+    Image.new("RGBA", (300, 300), "#ffffff").save(template_path)
+    PLUGIN_SETTINGS.update(
+        FORMAT_EXTENSION="jpg", VARIANTS={"rgba": {"TEMPLATE": template_path}}
+    )
+    article = make_article("RGBA template test", "rgba.html")
+    article.set_custom_data({"og_image_template": "rgba"})
+
+    generate_cards(FakeGenerator([article]))
+
+    with Image.open(PLUGIN_SETTINGS["PATH"] / "rgba.jpg") as img:
+        assert img.mode == "RGB"
+
+
+def test_unchanged_card_is_not_replaced(generation_settings):
+    """Saving card identical to existing file doesn't touch that file."""
+    generator = FakeGenerator([make_article("Unchanged card", "unchanged.html")])
+    card_path = PLUGIN_SETTINGS["PATH"] / "unchanged.png"
+    PLUGIN_SETTINGS.update(FORCE_SAVE=True)
+    generate_cards(generator)
+    os.utime(card_path, ns=(0, 0))
+
+    generate_cards(generator)
+
+    assert card_path.stat().st_mtime_ns == 0
+    assert generators_stats["FakeGenerator"].counters["unchanged"] == 1
+
+    PLUGIN_SETTINGS.update(FONT_FILL="#ff0000")
+    generate_cards(generator)
+
+    assert card_path.stat().st_mtime_ns != 0
+    assert list(PLUGIN_SETTINGS["PATH"].iterdir()) == [card_path]
+
+
+@pytest.mark.parametrize("manifest", [False, True])
+def test_font_and_template_not_loaded_for_existing_cards(
+    tmp_path, generation_settings, manifest
+):
+    """Font and template are only loaded when there's card to draw."""
+    if manifest:
+        PLUGIN_SETTINGS.update(MANIFEST=tmp_path / "manifest.json")
+    generator = FakeGenerator([make_article("Existing card", "existing.html")])
+    generate_cards(generator)
+    CardsGenerator._font = None
+    CardsGenerator._template = None
+
+    generate_cards(generator)
+
+    assert CardsGenerator._font is None
+    assert CardsGenerator._template is None
+    assert generators_stats["FakeGenerator"].counters["skipped_existing"] == 1
+
+
+def test_rebuild_renders_only_changed_cards(generation_settings):
+    """Cards rendered earlier by the same process are not drawn again."""
+    PLUGIN_SETTINGS.update(FORCE_SAVE=True)
+    generator = FakeGenerator(
+        [make_article("First title", "first.html"), make_article("Second", "s.html")]
+    )
+    generate_cards(generator)
+
+    generator.articles[0].metadata["title"] = "Edited title"
+    generate_cards(generator)
+
+    counters = generators_stats["FakeGenerator"].counters
+    assert counters["rendered"] == 1
+    assert counters["skipped_existing"] == 1
+
+
+def test_changed_template_is_loaded_again(generation_settings):
+    """Template is kept between builds, until its file is modified."""
+    generator = FakeGenerator([make_article("Title", "title.html")])
+    card_path = PLUGIN_SETTINGS["PATH"] / "title.png"
+    PLUGIN_SETTINGS.update(FORCE_SAVE=True)
+    generate_cards(generator)
+    template = CardsGenerator._template
+
+    CardsGenerator()
+    assert CardsGenerator._template is template
+
+    Image.new("RGB", (300, 300), "#ff0000").save(PLUGIN_SETTINGS["TEMPLATE"])
+    os.utime(PLUGIN_SETTINGS["TEMPLATE"], ns=(0, 0))
+    generate_cards(generator)
+
+    with Image.open(card_path) as card:
+        assert card.getpixel((299, 299)) == (255, 0, 0)
+
+
+def test_variant_font_loaded_before_default_font(variant_settings, monkeypatch):
+    """Card with variant font can be drawn before default font is loaded."""
+    monkeypatch.setattr(CardsGenerator, "_font", None)
+    monkeypatch.setattr(CardsGenerator, "_fonts", None)
+    article = make_article("Variant font", "variant-font.html")
+    article.set_custom_data({"og_image_template": "blue"})
+
+    generate_cards(FakeGenerator([article]))
+
+    assert (PLUGIN_SETTINGS["PATH"] / "variant-font.png").exists()
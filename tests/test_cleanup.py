@@ -0,0 +1,61 @@
+from conftest import make_article
+import pytest
+
+from pelican.generators import PagesGenerator
+from pelican.plugins.social_cards.manifest import CardsManifest
+from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS
+from pelican.plugins.social_cards.social_cards import (
+    cards_index,
+    generate_cards,
+    generators_stats,
+)
+
+
+@pytest.fixture()
+def pages_generator(generation_settings):
+    cards_index.clear()
+    generator = PagesGenerator.__new__(PagesGenerator)
+    generator.pages = [make_article("Kept page", "kept.html")]
+    (PLUGIN_SETTINGS["PATH"] / "kept.png").write_bytes(b"kept")
+    (PLUGIN_SETTINGS["PATH"] / "deleted.png").write_bytes(b"deleted")
+    (PLUGIN_SETTINGS["PATH"] / "notes.txt").write_text("not a card")
+    yield generator
+    cards_index.clear()
+
+
+def test_orphaned_cards_are_reported(pages_generator, caplog):
+    PLUGIN_SETTINGS.update(CLEANUP="report")
+
+    generate_cards(pages_generator)
+
+    assert (PLUGIN_SETTINGS["PATH"] / "deleted.png").exists()
+    assert "deleted.png is not used by any article or page" in caplog.text
+    assert generators_stats["pages"].counters["orphaned"] == 1
+
+
+def test_orphaned_cards_are_removed(pages_generator):
+    PLUGIN_SETTINGS.update(CLEANUP="remove", MANIFEST=PLUGIN_SETTINGS["PATH"] / "m")
+    manifest = CardsManifest(PLUGIN_SETTINGS["MANIFEST"])
+    manifest.update(PLUGIN_SETTINGS["PATH"] / "deleted.png", "fingerprint")
+    manifest.save()
+    nested_card = PLUGIN_SETTINGS["PATH"] / "2020" / "old.png"
+    nested_card.parent.mkdir()
+    nested_card.write_bytes(b"old")
+
+    generate_cards(pages_generator)
+
+    assert sorted(path.name for path in PLUGIN_SETTINGS["PATH"].iterdir()) == [
+        "kept.png",
+        "m",
+        "notes.txt",
+    ]
+    manifest = CardsManifest(PLUGIN_SETTINGS["MANIFEST"])
+    assert not manifest.is_current(
+        PLUGIN_SETTINGS["PATH"] / "deleted.png", "fingerprint"
+    )
+
+
+def test_cleanup_is_disabled_by_default(pages_generator):
+    generate_cards(pages_generator)
+
+    assert (PLUGIN_SETTINGS["PATH"] / "deleted.png").exists()
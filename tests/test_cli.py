@@ -0,0 +1,161 @@
+import io
+import json
+from pathlib import Path
+
+from PIL import Image
+import pytest
+
+from pelican.plugins.social_cards import cli
+from pelican.plugins.social_cards.cards_generator import CardsGenerator
+from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS
+
+FONT_PATH = Path(__file__).parent / "fonts" / "LiberationMono-Regular.ttf"
+
+
+@pytest.fixture()
+def site(tmp_path, monkeypatch):
+    """Create minimal Pelican site in temporary directory."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "content").mkdir()
+    Image.new("RGB", (300, 300), "#ffffff").save(tmp_path / "template.png")
+    (tmp_path / "pelicanconf.py").write_text(
+        f'PATH = "content"\n'
+        f'SOCIAL_CARDS_TEMPLATE = "template.png"\n'
+        f'SOCIAL_CARDS_FONT_FILENAME = "{FONT_PATH.as_posix()}"\n'
+        f"SOCIAL_CARDS_FONT_SIZE = 20\n"
+        f"SOCIAL_CARDS_CANVAS_WIDTH = 300\n"
+        f"SOCIAL_CARDS_CANVAS_HEIGHT = 300\n"
+    )
+    CardsGenerator.unload_files()
+    yield tmp_path
+    CardsGenerator.unload_files()
+
+
+def test_render_titles_and_json_file(site, capsys):
+    entries = ["From file", {"title": "Custom name", "save_as": "posts/custom.html"}]
+    (site / "titles.json").write_text(json.dumps(entries))
+
+    exit_code = cli.main(
+        ["render", "-o", "cards", "-i", "titles.json", "Hello, World!"]
+    )
+
+    assert exit_code == 0
+    assert sorted(path.name for path in (site / "cards").iterdir()) == [
+        "from-file.png",
+        "hello-world.png",
+        "posts-custom.png",
+    ]
+    assert f"{site / 'cards' / 'hello-world.png'}" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    ("input_format", "text"),
+    [("auto", "First\nSecond\n"), ("csv", "title\nFirst\nSecond\n")],
+)
+def test_render_from_stdin(site, monkeypatch, input_format, text):
+    monkeypatch.setattr("sys.stdin", io.StringIO(text))
+
+    cli.main(["render", "-o", "cards", "-f", input_format])
+
+    assert sorted(path.name for path in (site / "cards").iterdir()) == [
+        "first.png",
+        "second.png",
+    ]
+
+
+def test_render_without_template_fails(site):
+    (site / "pelicanconf.py").write_text('PATH = "content"\n')
+
+    assert cli.main(["render", "Title"]) == 1
+
+
+def test_watch_renders_again_after_template_change(site, monkeypatch):
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 1:
+            Image.new("RGB", (300, 300), "#ff0000").save(site / "template.png")
+        elif len(sleeps) > 1:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(cli.time, "sleep", fake_sleep)
+
+    cli.main(["render", "-o", "cards", "--watch", "Title"])
+
+    card = Image.open(site / "cards" / "title.png")
+    assert card.getpixel((299, 299)) == (255, 0, 0)
+
+
+def test_draft_contact_sheet(site):
+    exit_code = cli.main(
+        ["render", "-o", "cards", "--draft", "0.5", "-c", "sheet.png", "A", "B", "C"]
+    )
+
+    assert exit_code == 0
+    assert Image.open(site / "cards" / "a.png").size == (150, 150)
+    assert (PLUGIN_SETTINGS["FONT_SIZE"], PLUGIN_SETTINGS["CANVAS_WIDTH"]) == (10, 150)
+    assert PLUGIN_SETTINGS["SAVE_OPTIONS"] == {"png": {"compress_level": 1}}
+    # 2x2 grid of 150x150 cards, with captions and margins
+    assert Image.open(site / "sheet.png").size == (312, 336)
+
+
+def test_contact_sheet_only(site):
+    cli.main(["render", "-o", "cards", "--sheet-only", "-c", "sheet.jpg", "A", "B"])
+
+    assert not list((site / "cards").iterdir())
+    assert Image.open(site / "sheet.jpg").size == (492, 260)
+
+
+def test_invalid_draft_scale_is_ignored(site):
+    cli.main(["render", "-o", "cards", "--draft", "2", "A"])
+
+    assert PLUGIN_SETTINGS["DRAFT_SCALE"] is None
+    assert Image.open(site / "cards" / "a.png").size == (300, 300)
+
+
+def test_audit_site_reports_overflowing_text(site, capsys):
+    for slug, title in (
+        ("short", "Short"),
+        ("long", "Supercalifragilisticexpialidocious"),
+    ):
+        (site / "content" / f"{slug}.md").write_text(
+            f"Title: {title}\nDate: 2020-01-01\n\nText\n"
+        )
+
+    exit_code = cli.main(["audit", "--json", "audit.json"])
+
+    assert exit_code == cli.OVERFLOW_EXIT_CODE
+    report = json.loads((site / "audit.json").read_text())
+    assert report["articles"]["checked"] == len(["short", "long"])
+    assert report["articles"]["canvas"] == {"width": 300, "height": 300}
+    [overflowing] = report["articles"]["overflowing"]
+    assert overflowing["source_path"].endswith("long.md")
+    assert overflowing["width"] > report["articles"]["canvas"]["width"]
+    assert "long.md: " in capsys.readouterr().out
+    assert not (site / "content" / "social-cards").exists()
+    assert not (site / "output").exists()
+
+
+def test_audit_titles_prints_json(site, capsys):
+    exit_code = cli.main(["audit", "--json", "-", "Short title"])
+
+    assert exit_code == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["titles"]["checked"] == 1
+    assert report["titles"]["overflowing"] == []
+
+
+def test_draft_uses_fast_encoder_options(site, monkeypatch):
+    save_calls = []
+    original_save = Image.Image.save
+
+    def save(self, *args, **params):
+        save_calls.append(params)
+        return original_save(self, *args, **params)
+
+    monkeypatch.setattr(Image.Image, "save", save)
+
+    cli.main(["render", "--draft", "-o", "cards", "Fast draft"])
+
+    assert [params.get("compress_level") for params in save_calls] == [1]
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from conftest import FakeGenerator, make_article
+
+from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS
+from pelican.plugins.social_cards.social_cards import generate_cards, generators_stats
+
+
+def make_translations():
+    return FakeGenerator(
+        [
+            make_article("Same title", "same-title.html"),
+            make_article("Same title", "pl/same-title.html"),
+            make_article("Other title", "other-title.html"),
+        ]
+    )
+
+
+def test_duplicates_are_linked(generation_settings):
+    """Card with the same text is generated once and linked."""
+    PLUGIN_SETTINGS.update(DEDUPLICATE="link")
+    generator = make_translations()
+
+    generate_cards(generator)
+
+    original = PLUGIN_SETTINGS["PATH"] / "same-title.png"
+    duplicate = PLUGIN_SETTINGS["PATH"] / "pl-same-title.png"
+    assert duplicate.read_bytes() == original.read_bytes()
+    assert generator.articles[1].og_image_source == duplicate.as_posix()
+    assert generators_stats["FakeGenerator"].counters == {
+        "rendered": 2,
+        "deduplicated": 1,
+    }
+
+
+def test_duplicates_share_file(generation_settings):
+    """Content objects with the same text point to the same card."""
+    PLUGIN_SETTINGS.update(DEDUPLICATE="share")
+    generator = make_translations()
+
+    generate_cards(generator)
+
+    first, translation, other = (
+        Path(article.og_image_source) for article in generator.articles
+    )
+    assert first == translation
+    assert sorted(PLUGIN_SETTINGS["PATH"].iterdir()) == sorted([first, other])
+    assert generators_stats["FakeGenerator"].counters == {"rendered": 2}
+
+    generate_cards(generator)
+
+    assert generators_stats["FakeGenerator"].counters == {"skipped_existing": 3}
+
+
+def test_rendering_linked_card_keeps_duplicates(generation_settings):
+    """Card is replaced, not written through hardlinks of its duplicates."""
+    PLUGIN_SETTINGS.update(DEDUPLICATE="link", FORCE_SAVE=True)
+    generator = make_translations()
+    generate_cards(generator)
+    duplicate = PLUGIN_SETTINGS["PATH"] / "pl-same-title.png"
+    duplicate_data = duplicate.read_bytes()
+
+    generator.articles[0].metadata["title"] = "Changed title"
+    generate_cards(FakeGenerator(generator.articles[:1]))
+
+    original = PLUGIN_SETTINGS["PATH"] / "same-title.png"
+    assert original.read_bytes() != duplicate_data
+    assert duplicate.read_bytes() == duplicate_data
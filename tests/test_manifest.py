@@ -0,0 +1,69 @@
+import pytest
+
+from pelican.plugins.social_cards.cards_generator import CardsGenerator
+from pelican.plugins.social_cards.manifest import CardsManifest
+from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS
+
+
+@pytest.fixture()
+def manifest_settings(tmp_path, generation_settings):
+    PLUGIN_SETTINGS.update(MANIFEST=tmp_path / "social-cards.json")
+
+
+@pytest.fixture()
+def card_article(article):
+    article.set_custom_data(
+        {"save_as": "fake-title.html", "source_path": "content/fake-title.md"}
+    )
+    return article
+
+
+def generate(article):
+    manifest = CardsManifest(PLUGIN_SETTINGS["MANIFEST"])
+    CardsGenerator(manifest=manifest).create_for_object(article)
+    manifest.save()
+    return PLUGIN_SETTINGS["PATH"] / "fake-title.png"
+
+
+def test_unchanged_card_is_not_regenerated(manifest_settings, card_article):
+    """Card is left alone when nothing that affects it has changed."""
+    card_path = generate(card_article)
+    card_path.write_bytes(b"sentinel")
+
+    generate(card_article)
+
+    assert card_path.read_bytes() == b"sentinel"
+
+
+def test_changed_title_regenerates_card(manifest_settings, card_article):
+    """Card is generated again when article title has changed."""
+    card_path = generate(card_article)
+    card_path.write_bytes(b"sentinel")
+
+    card_article.metadata["title"] = "Another Fake Title"
+    generate(card_article)
+
+    assert card_path.read_bytes() != b"sentinel"
+
+
+def test_changed_settings_regenerate_card(manifest_settings, card_article):
+    """Card is generated again when visual settings have changed."""
+    card_path = generate(card_article)
+    card_path.write_bytes(b"sentinel")
+
+    PLUGIN_SETTINGS["FONT_FILL"] = "#ff0000"
+    generate(card_article)
+
+    assert card_path.read_bytes() != b"sentinel"
+
+
+def test_existing_card_without_manifest_entry_is_regenerated(
+    manifest_settings, card_article
+):
+    """Cards created before manifest was enabled are generated again."""
+    card_path = PLUGIN_SETTINGS["PATH"] / "fake-title.png"
+    card_path.write_bytes(b"sentinel")
+
+    generate(card_article)
+
+    assert card_path.read_bytes() != b"sentinel"
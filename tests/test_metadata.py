@@ -1,5 +1,16 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+from conftest import make_article
+import pytest
+
+from pelican.generators import ArticlesGenerator, StaticGenerator
 from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS
-from pelican.plugins.social_cards.social_cards import should_skip_object
+from pelican.plugins.social_cards.social_cards import (
+    attach_metadata,
+    generate_cards,
+    should_skip_object,
+)
 
 
 def test_og_image_is_left_alone(article, default_settings):
@@ -56,3 +67,50 @@ def test_canvas_outside_of_template_issues_warning(
     assert caplog.records
     assert any(r for r in caplog.records if r.levelname == "WARNING")
     assert "text may be drawn outside of image borders" in caplog.text
+
+
+def make_generator(generator_class, **attributes):
+    generator = generator_class.__new__(generator_class)
+    for name, value in attributes.items():
+        setattr(generator, name, value)
+    return generator
+
+
+@pytest.mark.parametrize("with_context", [True, False])
+def test_attach_metadata(generation_settings, tmp_path, with_context):
+    PLUGIN_SETTINGS.update(INCLUDE_SITEURL=True)
+    articles = [make_article("First", "first.html"), make_article("Second", "2.html")]
+    articles_generator = make_generator(
+        ArticlesGenerator,
+        articles=articles,
+        settings={"SITEURL": "https://www.fakesite.invalid"},
+    )
+    generate_cards(articles_generator)
+
+    static_files = [
+        SimpleNamespace(
+            source_path=path.as_posix(), save_as=f"images/cards/{path.name}"
+        )
+        for path in sorted(PLUGIN_SETTINGS["PATH"].iterdir())
+    ]
+    static_files.append(
+        SimpleNamespace(source_path=(tmp_path / "photo.jpg").as_posix(), save_as="x")
+    )
+    static_generator = make_generator(StaticGenerator, staticfiles=static_files)
+    if with_context:
+        static_generator.settings = {"PATH": str(tmp_path)}
+        static_generator.context = {
+            "static_content": {
+                Path(static_file.source_path).relative_to(tmp_path).as_posix(): (
+                    static_file
+                )
+                for static_file in static_files
+            }
+        }
+
+    attach_metadata([articles_generator, static_generator])
+
+    assert articles[0].og_image == "https://www.fakesite.invalid/images/cards/first.png"
+    assert articles[1].metadata["og_image"] == (
+        "https://www.fakesite.invalid/images/cards/2.png"
+    )
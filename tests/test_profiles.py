@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+from conftest import FakeGenerator, make_article
+from PIL import Image
+import pytest
+
+from pelican.generators import ArticlesGenerator, StaticGenerator
+from pelican.plugins.social_cards.cards_generator import CardsGenerator
+from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS, validate_profiles
+from pelican.plugins.social_cards.social_cards import (
+    attach_metadata,
+    cards_index,
+    generate_cards,
+)
+
+
+@pytest.fixture()
+def profile_settings(generation_settings):
+    cards_index.clear()
+    PLUGIN_SETTINGS.update(
+        PROFILES=validate_profiles(
+            {"twitter_image": {"SIZE": [150, 100], "FORMAT_EXTENSION": "jpg"}}
+        )
+    )
+    yield
+    cards_index.clear()
+
+
+def test_profiles_are_drawn_once(profile_settings, monkeypatch):
+    """Each profile is scaled from the same drawn card."""
+    draw_calls = []
+    original_draw_text = CardsGenerator._draw_text
+
+    def draw_text(self, *args):
+        draw_calls.append(args)
+        return original_draw_text(self, *args)
+
+    monkeypatch.setattr(CardsGenerator, "_draw_text", draw_text)
+
+    generate_cards(FakeGenerator([make_article("Profiles", "profiles.html")]))
+
+    assert len(draw_calls) == 1
+    assert Image.open(PLUGIN_SETTINGS["PATH"] / "profiles.png").size == (300, 300)
+    with Image.open(PLUGIN_SETTINGS["PATH"] / "profiles-twitter_image.jpg") as img:
+        assert (img.format, img.size) == ("JPEG", (150, 100))
+
+
+def test_missing_profile_is_generated(profile_settings):
+    generator = FakeGenerator([make_article("Profiles", "profiles.html")])
+    generate_cards(generator)
+    profile_path = PLUGIN_SETTINGS["PATH"] / "profiles-twitter_image.jpg"
+    profile_path.unlink()
+
+    generate_cards(generator)
+
+    assert profile_path.exists()
+
+
+def test_profiles_are_attached(profile_settings, tmp_path):
+    article = make_article("Profiles", "profiles.html")
+    articles_generator = ArticlesGenerator.__new__(ArticlesGenerator)
+    articles_generator.articles = [article]
+    generate_cards(articles_generator)
+    static_generator = StaticGenerator.__new__(StaticGenerator)
+    static_generator.staticfiles = [
+        SimpleNamespace(source_path=path.as_posix(), save_as=f"cards/{path.name}")
+        for path in PLUGIN_SETTINGS["PATH"].iterdir()
+    ]
+
+    attach_metadata([articles_generator, static_generator])
+
+    assert article.og_image == "cards/profiles.png"
+    assert article.metadata["twitter_image"] == "cards/profiles-twitter_image.jpg"
+
+
+def test_invalid_profiles_are_skipped(default_settings, caplog):
+    profiles = validate_profiles(
+        {
+            "no_size": {},
+            "og_image": {"SIZE": (10, 10)},
+            "valid": {"SIZE": ("20", 10)},
+            "unsupported": {"SIZE": (10, 10), "FORMAT_EXTENSION": "xyz"},
+        }
+    )
+
+    assert profiles == {"valid": {"SIZE": (20, 10), "FORMAT_EXTENSION": "png"}}
+    assert "no_size must have SIZE" in caplog.text
+    assert "unsupported: Pillow can't save images in .xyz format" in caplog.text
+
+
+def test_profiles_of_duplicates_are_linked(profile_settings):
+    PLUGIN_SETTINGS.update(DEDUPLICATE="link")
+
+    generate_cards(
+        FakeGenerator(
+            [make_article("Same", "same.html"), make_article("Same", "pl/same.html")]
+        )
+    )
+
+    original = PLUGIN_SETTINGS["PATH"] / "same-twitter_image.jpg"
+    duplicate = PLUGIN_SETTINGS["PATH"] / "pl-same-twitter_image.jpg"
+    assert duplicate.read_bytes() == original.read_bytes()
+
+
+def test_profile_converted_for_output_format(profile_settings, tmp_path):
+    """Card drawn on RGBA template can be saved in JPEG profile."""
+    template_path = tmp_path / "rgba.png"
+    Image.new("RGBA", (300, 300), "#ffffff").save(template_path)
+    PLUGIN_SETTINGS["TEMPLATE"] = template_path
+    CardsGenerator.unload_files(font=False)
+
+    generate_cards(FakeGenerator([make_article("RGBA template", "rgba.html")]))
+
+    with Image.open(PLUGIN_SETTINGS["PATH"] / "rgba.png") as img:
+        assert img.mode == "RGBA"
+    with Image.open(PLUGIN_SETTINGS["PATH"] / "rgba-twitter_image.jpg") as img:
+        assert img.mode == "RGB"
@@ -0,0 +1,61 @@
+import json
+from types import SimpleNamespace
+
+from conftest import FakeGenerator, make_article
+
+from pelican.plugins.social_cards.settings import (
+    PLUGIN_SETTINGS,
+    populate_plugin_settings,
+)
+from pelican.plugins.social_cards.social_cards import generate_cards
+
+
+def test_stats_file(tmp_path, generation_settings):
+    """Counters and timings are saved to stats file."""
+    stats_path = tmp_path / "stats.json"
+    PLUGIN_SETTINGS.update(STATS_FILE=stats_path, CANVAS_WIDTH=50)
+    skipped = make_article("Article with image", "skipped.html")
+    skipped.set_custom_data({"og_image": "custom.png"})
+    generator = FakeGenerator(
+        [
+            make_article("First article", "first.html"),
+            make_article("Second article", "second.html"),
+            skipped,
+        ]
+    )
+    (PLUGIN_SETTINGS["PATH"] / "second.png").write_bytes(b"")
+
+    generate_cards(generator)
+
+    stats = json.loads(stats_path.read_text())["FakeGenerator"]
+    assert stats["counters"] == {
+        "rendered": 1,
+        "skipped_existing": 1,
+        "skipped_by_key": 1,
+        "overflow": 1,
+    }
+    assert set(stats["timings"]) == {
+        "exists_check",
+        "wrapping",
+        "layout",
+        "drawing",
+        "encoding",
+    }
+    assert stats["peak_memory"] > 0
+    assert [card["path"] for card in stats["slowest_cards"]] == [
+        str(PLUGIN_SETTINGS["PATH"] / "first.png")
+    ]
+
+
+def test_stats_file_relative_to_content_path(tmp_path, default_settings):
+    pelican_instance = SimpleNamespace(
+        settings={
+            "PATH": str(tmp_path),
+            "SOCIAL_CARDS_TEMPLATE": "template.png",
+            "SOCIAL_CARDS_STATS_FILE": "stats/cards.json",
+        }
+    )
+
+    populate_plugin_settings(pelican_instance)
+
+    assert PLUGIN_SETTINGS["STATS_FILE"] == tmp_path / "stats" / "cards.json"
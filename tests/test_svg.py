@@ -0,0 +1,63 @@
+from xml.etree import ElementTree as ET
+
+from conftest import FakeGenerator, make_article
+from PIL import Image
+import pytest
+
+from pelican.plugins.social_cards.cards_generator import CardsGenerator
+from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS, validate_profiles
+from pelican.plugins.social_cards.social_cards import generate_cards
+
+SVG = "{http://www.w3.org/2000/svg}"
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+
+
+@pytest.fixture()
+def svg_settings(generation_settings):
+    PLUGIN_SETTINGS.update(FORMAT_EXTENSION="svg", FONT_OUTLINE_SIZE=2)
+    # template must be read from file, like in real build
+    CardsGenerator.unload_files(font=False)
+
+
+def test_svg_card_is_not_drawn(svg_settings, monkeypatch):
+    """Text is placed on embedded template without rasterizing anything."""
+    monkeypatch.setattr(CardsGenerator, "_draw_text", None)
+
+    generate_cards(FakeGenerator([make_article("Vector <card>", "vector.html")]))
+
+    svg = ET.parse(PLUGIN_SETTINGS["PATH"] / "vector.svg").getroot()
+    assert (svg.get("width"), svg.get("height")) == ("300", "300")
+    assert svg.find(f"{SVG}image").get(XLINK_HREF).startswith("data:image/png;base64,")
+    group = svg.find(f"{SVG}g")
+    assert group.get("font-family") == "Liberation Mono"
+    assert group.get("stroke-width") == "4"
+    [text] = group.findall(f"{SVG}text")
+    assert text.text == "Vector <card>"
+    ascent = CardsGenerator()._get_font().getmetrics()[0]
+    assert (text.get("x"), text.get("y")) == ("0", str(ascent))
+    assert CardsGenerator._template is None
+
+
+def test_raster_fallback_and_linked_template(svg_settings):
+    """Bitmap profile is drawn next to SVG card, which links template file."""
+    PLUGIN_SETTINGS.update(
+        SVG_TEMPLATE="link",
+        PROFILES=validate_profiles(
+            {
+                "og_image_png": {"SIZE": (150, 150), "FORMAT_EXTENSION": "png"},
+                "og_image_wide": {"SIZE": (300, 150), "FORMAT_EXTENSION": "svg"},
+            }
+        ),
+    )
+
+    generate_cards(FakeGenerator([make_article("Vector card", "vector.html")]))
+
+    card_path = PLUGIN_SETTINGS["PATH"] / "vector.svg"
+    svg = ET.parse(card_path).getroot()
+    href = svg.find(f"{SVG}image").get(XLINK_HREF)
+    assert (card_path.parent / href).resolve() == PLUGIN_SETTINGS["TEMPLATE"].resolve()
+    wide = ET.parse(PLUGIN_SETTINGS["PATH"] / "vector-og_image_wide.svg")
+    assert wide.getroot().get("viewBox") == "0 0 300 300"
+    assert wide.getroot().get("height") == "150"
+    with Image.open(PLUGIN_SETTINGS["PATH"] / "vector-og_image_png.png") as img:
+        assert img.size == (150, 150)
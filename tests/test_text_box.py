@@ -1,6 +1,10 @@
+from unittest import mock
+
 import pytest
 
-from pelican.plugins.social_cards.cards_generator import TextBox
+from pelican.plugins.social_cards.cards_generator import TextBox, wrap_to_width
+from pelican.plugins.social_cards.metrics import LineMetricsCache
+from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS
 
 
 @pytest.mark.parametrize(
@@ -13,6 +17,86 @@ def test_text_box_dimensions(
 ):
     """Check calculated text_box dimensions."""
     text = ["This is fake text", "with", "variable-length", "lines"]
-    tb = TextBox(text, cards_generator._font)
+    tb = TextBox(text, cards_generator._get_font())
 
     assert getattr(tb, property_name) == expected
+
+
+def test_line_metrics_cache_is_bounded(default_settings, cards_generator):
+    """Least recently used lines are removed from metrics cache."""
+    font = cards_generator._get_font()
+    cache = LineMetricsCache(maxsize=2)
+    cache.getbbox(font, "first")
+    cache.getbbox(font, "second")
+    cache.getbbox(font, "first")
+    cache.getbbox(font, "third")
+
+    with mock.patch.object(font, "getbbox", wraps=font.getbbox) as getbbox:
+        cache.getbbox(font, "first")
+        cache.getbbox(font, "third")
+        assert getbbox.call_count == 0
+
+        cache.getbbox(font, "second")
+        assert getbbox.call_count == 1
+
+
+def test_line_metrics_cache_is_persisted(tmp_path, default_settings, cards_generator):
+    """Lines measured in previous build are not measured again."""
+    font = cards_generator._get_font()
+    cache_path = tmp_path / "metrics.json"
+    cache = LineMetricsCache()
+    expected = cache.getbbox(font, "Line measured in previous build")
+    cache.save(cache_path)
+
+    cache = LineMetricsCache()
+    cache.load(cache_path)
+
+    with mock.patch.object(font, "getbbox", side_effect=AssertionError):
+        assert cache.getbbox(font, "Line measured in previous build") == expected
+
+
+def test_wrap_to_width(default_settings, cards_generator):
+    """Text is wrapped to lines no wider than given number of pixels."""
+    font = cards_generator._get_font()
+    text = "Lines are broken on whitespace to fit given width in pixels"
+    width = 150
+
+    lines = wrap_to_width(text, font, width)
+
+    assert " ".join(lines) == text
+    assert all(font.getlength(line) <= width for line in lines)
+    assert font.getlength(f"{lines[0]} {lines[1].split()[0]}") > width
+
+
+def test_auto_fit_keeps_font_size_of_short_title(
+    article, default_settings, cards_generator
+):
+    """Text that fits on canvas is drawn with configured font size."""
+    PLUGIN_SETTINGS.update(AUTO_FIT=True, MIN_FONT_SIZE=5)
+
+    text, font_size = cards_generator._get_article_text(article)
+
+    assert text == [article.title]
+    assert font_size == PLUGIN_SETTINGS["FONT_SIZE"]
+
+
+@pytest.mark.parametrize("custom_text", [False, True])
+def test_auto_fit_reduces_font_size(
+    article, default_settings, cards_generator, custom_text
+):
+    """Font size is reduced until text fits on canvas."""
+    long_line = " ".join(["Very long article title"] * 3)
+    PLUGIN_SETTINGS.update(AUTO_FIT=True, MIN_FONT_SIZE=5, FONT_SIZE=60)
+    if custom_text:
+        article.set_custom_data({"og_image_text": "\\n".join([long_line] * 4)})
+    else:
+        article.metadata["title"] = " ".join([long_line] * 4)
+
+    text, font_size = cards_generator._get_article_text(article)
+    text_box = TextBox(text, cards_generator._get_font(font_size))
+
+    assert font_size < PLUGIN_SETTINGS["FONT_SIZE"]
+    assert text_box.width <= PLUGIN_SETTINGS["CANVAS_WIDTH"]
+    assert text_box.height <= PLUGIN_SETTINGS["CANVAS_HEIGHT"]
+    if custom_text:
+        assert text == [long_line] * 4
@@ -0,0 +1,55 @@
+from conftest import FakeGenerator, make_article
+import pytest
+
+from pelican.plugins.social_cards import workers
+from pelican.plugins.social_cards.settings import PLUGIN_SETTINGS
+from pelican.plugins.social_cards.social_cards import generate_cards, generators_stats
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {"WORKERS": 2},
+        {"WORKERS": 2, "SHARED_TEMPLATE": True},
+        {"ENCODER_THREADS": 2},
+        {"ENCODER_THREADS": 2, "MEMORY_BUDGET": 1},
+    ],
+    ids=["processes", "shared_template", "threads", "memory_budget"],
+)
+def test_cards_rendered_concurrently_match_sequential(
+    generation_settings, monkeypatch, settings
+):
+    """Cards rendered concurrently are the same as rendered one by one."""
+    if settings.pop("SHARED_TEMPLATE", False):
+        monkeypatch.setattr(workers, "SHARED_TEMPLATE_MIN_BYTES", 0)
+    generator = FakeGenerator(
+        [
+            make_article(f"Fake title number {i}" + " long" * (i % 3), f"fake-{i}.html")
+            for i in range(9)
+        ]
+    )
+    card_paths = [PLUGIN_SETTINGS["PATH"] / f"fake-{i}.png" for i in range(9)]
+
+    generate_cards(generator)
+    expected = [path.read_bytes() for path in card_paths]
+
+    PLUGIN_SETTINGS.update(FORCE_SAVE=True, **settings)
+    for path in card_paths:
+        path.unlink()
+    generate_cards(generator)
+
+    assert [path.read_bytes() for path in card_paths] == expected
+    assert generator.articles[0].og_image_source == card_paths[0].as_posix()
+    assert generators_stats["FakeGenerator"].counters["rendered"] == len(card_paths)
+
+
+@pytest.mark.parametrize(
+    ("budget", "expected"),
+    [(0, 8), (100, 8), (10, 4), (1, 1)],
+)
+def test_fit_in_memory_budget(default_settings, budget, expected):
+    """Number of images is limited by budget, but at least one is allowed."""
+    PLUGIN_SETTINGS["MEMORY_BUDGET"] = budget
+    megabyte = 1024 * 1024
+
+    assert workers.fit_in_memory_budget(8, 2 * megabyte, 2 * megabyte) == expected